@@ -0,0 +1,594 @@
+"""
+Benchmarks für die heißen Pfade des Bots.
+
+    python src/benchmark.py matching [--resolutions 1920x1080,3840x2160] [--repeat 5]
+    python src/benchmark.py multi [--resolution 1920x1080] [--counts 1,2,4,8]
+    python src/benchmark.py sound [--duration 60] [--noise 0.05]
+    python src/benchmark.py convert [--resolutions 1920x1080,3840x2160]
+    python src/benchmark.py motion [--resolutions 1920x1080,3840x2160]
+    python src/benchmark.py features [--resolution 1920x1080] [--frames 3]
+    python src/benchmark.py loading
+    python src/benchmark.py startup [--modules gui,main]
+    python src/benchmark.py all [--json ergebnisse.jsonl]
+
+Mit --json PFAD (oder --json - für stdout) wird jedes Messergebnis zusätzlich als JSON-Zeile
+geschrieben, inklusive einer "meta"-Zeile mit Versionen und Rechner, damit sich Läufe vergleichen lassen.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2 as cv
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from fishing.motion_detect import MotionDetector, lure_patch
+from fishing.screen_capture import FrameConverter
+from fishing.template_matcher import FALLBACK_CONFIDENCE, FEATURE_MODES, FramePyramid, feature_image, get_executor, match_brute, match_pyramid
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "fishing", "assets")
+DEFAULT_RESOLUTIONS = "1920x1080,2560x1440,3840x2160"
+# Ausschnitt, wie ihn eine Suchregion aus areas.json typischerweise hat
+ROI_SIZE = (640, 360)
+
+SRC_PATH = os.path.dirname(os.path.realpath(__file__))
+# Dürfen beim Start von gui.py/main.py noch nicht geladen sein
+HEAVY_MODULES = ("cv2", "numpy", "librosa", "scipy", "sounddevice", "pyautogui", "mss")
+STARTUP_PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+__import__({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+# Maschinenlesbare Ergebnisse des aktuellen Laufs (eine Zeile pro Messung)
+RESULTS = []
+
+
+def record(benchmark, **values):
+    RESULTS.append({"benchmark": benchmark, **values})
+
+
+def run_info():
+    return {
+        "benchmark": "meta",
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path):
+    lines = [json.dumps(r) for r in [run_info()] + RESULTS]
+    if path == "-":
+        print("\n".join(lines))
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"{len(RESULTS)} Ergebnisse nach {path} geschrieben.")
+
+
+def load_asset_templates():
+    templates = {}
+    for f in sorted(os.listdir(ASSETS_PATH)):
+        if f.endswith(".png"):
+            img = cv.imread(os.path.join(ASSETS_PATH, f))
+            if img is not None:
+                templates[f[:-4]] = img
+    return templates
+
+
+def make_background(width, height, rng):
+    """Glatter, wasserähnlicher Hintergrund mit etwas Rauschen."""
+    coarse = rng.integers(0, 256, (max(2, height // 64), max(2, width // 64), 3), dtype=np.uint8)
+    bg = cv.resize(coarse, (width, height), interpolation=cv.INTER_CUBIC)
+    noise = rng.normal(0, 6, (height, width, 3))
+    return np.clip(bg + noise, 0, 255).astype(np.uint8)
+
+
+def make_frame(width, height, target, distractors, rng):
+    """Baut einen Frame mit dem Ziel-Template an zufälliger Stelle. Gibt (frame, (x, y)) zurück, ohne target (frame, None)."""
+    frame = make_background(width, height, rng)
+    for d in distractors:
+        dh, dw = d.shape[:2]
+        x, y = int(rng.integers(0, width - dw)), int(rng.integers(0, height - dh))
+        frame[y:y + dh, x:x + dw] = d
+    if target is None:
+        return frame, None
+    th, tw = target.shape[:2]
+    x, y = int(rng.integers(0, width - tw)), int(rng.integers(0, height - th))
+    noisy = np.clip(target.astype(np.int16) + rng.integers(-8, 9, target.shape), 0, 255).astype(np.uint8)
+    frame[y:y + th, x:x + tw] = noisy
+    return frame, (x, y)
+
+
+def degrade(frame, rng):
+    """Dämmerung, Unschärfe und Sensorrauschen über den ganzen Frame (Köder inklusive)."""
+    dim = cv.GaussianBlur(frame, (5, 5), 0).astype(np.float32) * 0.6 + 10
+    return np.clip(dim + rng.normal(0, 10, frame.shape), 0, 255).astype(np.uint8)
+
+
+# Fälle für "matching": Köder unverändert, verschlechtert, in anderer Größe (UI-Skalierung) oder gar nicht im Bild
+MATCH_CASES = ("exakt", "verrauscht", "skaliert", "fehlt")
+MATCH_CASE_SCALE = 1.25
+
+
+def make_case(case, width, height, template, distractors, rng):
+    """Frame für einen Fall aus MATCH_CASES. Gibt (frame, (x, y) oder None, Toleranz in Pixeln) zurück."""
+    if case == "fehlt":
+        return make_frame(width, height, None, distractors, rng) + (0,)
+    if case == "skaliert":
+        scaled = cv.resize(template, None, fx=MATCH_CASE_SCALE, fy=MATCH_CASE_SCALE, interpolation=cv.INTER_LINEAR)
+        frame, (x, y) = make_frame(width, height, scaled, distractors, rng)
+        # Das Original passt am besten mittig in die vergrößerte Kopie
+        pad_y, pad_x = (scaled.shape[0] - template.shape[0]) // 2, (scaled.shape[1] - template.shape[1]) // 2
+        return frame, (x + pad_x, y + pad_y), max(pad_x, pad_y) + 2
+    frame, loc = make_frame(width, height, template, distractors, rng)
+    if case == "verrauscht":
+        frame = degrade(frame, rng)
+    return frame, loc, 2
+
+
+def parse_resolutions(text):
+    result = []
+    for part in text.split(","):
+        w, h = part.lower().split("x")
+        result.append((int(w), int(h)))
+    return result
+
+
+def time_call(fn, repeat):
+    best = float("inf")
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def bench_matching(args):
+    """
+    Brute-Force vs. Pyramide pro Fall aus MATCH_CASES. "FB" zählt, wie oft der Brute-Force-Fallback von
+    match_pyramid greifen würde: bei FALLBACK_CONFIDENCE (Standard) und bei --min-confidence (FishingAgent).
+    """
+    rng = np.random.default_rng(args.seed)
+    templates = load_asset_templates()
+    names = list(templates.keys())
+
+    print(f"{'Auflösung':>10} {'Fall':>10} {'brute ms':>9} {'pyramid ms':>10} {'ohne FB ms':>10} {'speedup':>8} "
+          f"{'ok':>7} {f'FB@{FALLBACK_CONFIDENCE:g}':>7} {f'FB@{args.min_confidence:g}':>7}")
+    for width, height in parse_resolutions(args.resolutions):
+        for case in MATCH_CASES:
+            total_brute = total_pyr = total_plain = 0.0
+            hits = present = fallbacks = agent_fallbacks = 0
+            for name in names:
+                distractors = [templates[n] for n in names if n != name][:3]
+                frame, target_loc, tolerance = make_case(case, width, height, templates[name], distractors, rng)
+
+                t_brute, _ = time_call(lambda: match_brute(frame, templates[name]), args.repeat)
+                # Pyramide pro Frame neu bauen, wie in find_lure
+                t_pyr, (_, loc) = time_call(lambda: match_pyramid(FramePyramid(frame), templates[name]), args.repeat)
+                t_plain, (score, _) = time_call(
+                    lambda: match_pyramid(FramePyramid(frame), templates[name], fallback_confidence=None), args.repeat)
+
+                ok = None
+                if target_loc is not None:
+                    ok = abs(loc[0] - target_loc[0]) <= tolerance and abs(loc[1] - target_loc[1]) <= tolerance
+                    hits += ok
+                    present += 1
+                fallbacks += score < FALLBACK_CONFIDENCE
+                agent_fallbacks += score < args.min_confidence
+                total_brute += t_brute
+                total_pyr += t_pyr
+                total_plain += t_plain
+                record("matching", resolution=f"{width}x{height}", case=case, template=name,
+                       brute_ms=t_brute * 1000, pyramid_ms=t_pyr * 1000, pyramid_no_fallback_ms=t_plain * 1000,
+                       pyramid_ok=ok, refined_score=float(score), fallback=bool(score < FALLBACK_CONFIDENCE),
+                       fallback_at_min_confidence=bool(score < args.min_confidence))
+
+            ok_text = f"{hits}/{present}" if present else "-"
+            print(f"{width}x{height:<5} {case:>10} {total_brute * 1000:9.1f} {total_pyr * 1000:10.1f} "
+                  f"{total_plain * 1000:10.1f} {total_brute / total_pyr:7.1f}x {ok_text:>7} "
+                  f"{fallbacks:>3}/{len(names):<3} {agent_fallbacks:>3}/{len(names):<3}")
+        print()
+
+
+def bench_multi(args):
+    """
+    Latenz von find_lure-artigem Matching in Abhängigkeit der Template-Anzahl, seriell vs. Pool.
+    Im Frame liegen nur vier Templates; die übrigen fehlen wie der Nacht-Köder am Tag. "agent" matcht
+    ohne Fallback pro Template und durchsucht nur dann alles, wenn keins --min-confidence erreicht.
+    """
+    rng = np.random.default_rng(args.seed)
+    templates = list(load_asset_templates().values())
+    (width, height), = parse_resolutions(args.resolution)
+    frame, _ = make_frame(width, height, templates[0], templates[1:4], rng)
+
+    def run_serial(targets):
+        pyr = FramePyramid(frame)
+        return max(match_pyramid(pyr, t) for t in targets)
+
+    def run_pool(targets):
+        pyr = FramePyramid(frame)
+        futures = [get_executor().submit(match_pyramid, pyr, t) for t in targets]
+        return max(f.result() for f in futures)
+
+    def run_agent(targets):
+        pyr = FramePyramid(frame)
+        futures = [get_executor().submit(match_pyramid, pyr, t, fallback_confidence=None) for t in targets]
+        best = max(f.result() for f in futures)
+        if best[0] < args.min_confidence:
+            best = max(best, *get_executor().map(lambda t: match_brute(frame, t), targets))
+        return best
+
+    print(f"{'Templates':>9} {'seriell ms':>10} {'pool ms':>8} {'agent ms':>9} {'Fallbacks':>9}")
+    for count in [int(c) for c in args.counts.split(",")]:
+        targets = [templates[i % len(templates)] for i in range(count)]
+        t_serial, _ = time_call(lambda: run_serial(targets), args.repeat)
+        t_pool, _ = time_call(lambda: run_pool(targets), args.repeat)
+        t_agent, _ = time_call(lambda: run_agent(targets), args.repeat)
+        pyr = FramePyramid(frame)
+        fallbacks = sum(match_pyramid(pyr, t, fallback_confidence=None)[0] < FALLBACK_CONFIDENCE for t in targets)
+        print(f"{count:9d} {t_serial * 1000:10.2f} {t_pool * 1000:8.2f} {t_agent * 1000:9.2f} {fallbacks:>4}/{count:<4}")
+        record("multi", resolution=args.resolution, templates=count, serial_ms=t_serial * 1000,
+               pool_ms=t_pool * 1000, agent_ms=t_agent * 1000, fallbacks=fallbacks)
+
+
+class LegacyCorrelation:
+    """Die frühere wait_for_sound-Schleife: Verlauf + Chunk zusammenfügen und komplett korrelieren."""
+
+    def __init__(self, template, threshold):
+        from scipy import signal
+        self._correlate = signal.correlate
+        self.template = template
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.overlap = np.zeros(len(self.template))
+
+    def process(self, block):
+        combined = np.concatenate((self.overlap, block))
+        self.overlap = combined[-len(self.template):]
+        if np.max(np.abs(combined)) < 0.01:
+            return 0.0
+        corr = self._correlate(combined, self.template, mode='valid', method='fft')
+        return float(np.max(np.abs(corr)))
+
+
+def stretch(signal, factor):
+    """Zeitlich gestrecktes/gestauchtes Signal (lineare Interpolation)."""
+    length = int(len(signal) * factor)
+    return np.interp(np.linspace(0, len(signal) - 1, length), np.arange(len(signal)), signal).astype(np.float32)
+
+
+def make_sound_stream(template, sample_rate, duration, events, noise, rng):
+    """Rauschen mit eingebettetem Template an bekannten Stellen. Gibt (stream, [(start, ende, gain)]) zurück."""
+    stream = rng.normal(0, noise, int(duration * sample_rate)).astype(np.float32)
+    spacing = len(stream) // (events + 1)
+    gains = np.geomspace(1.0, 0.2, events)
+    placed = []
+    for i, gain in enumerate(gains):
+        start = spacing * (i + 1) - len(template) // 2
+        stream[start:start + len(template)] += gain * template
+        placed.append((start, start + len(template), float(gain)))
+    return stream, placed
+
+
+def evaluate_detections(scores, threshold, chunk_size, events, sample_rate, grace=1.0):
+    """Ordnet Schwellwert-Überschreitungen den eingebetteten Events zu (Treffer, Latenzen, Fehlalarme)."""
+    latencies = {}
+    false_alarms = 0
+    above_prev = False
+    for i, score in enumerate(scores):
+        above = score > threshold
+        if above and not above_prev:
+            end = (i + 1) * chunk_size
+            for idx, (start, stop, _) in enumerate(events):
+                if start < end <= stop + grace * sample_rate:
+                    latencies.setdefault(idx, (end - stop) / sample_rate)
+                    break
+            else:
+                false_alarms += 1
+        above_prev = above
+    return latencies, false_alarms
+
+
+def bench_sound(args):
+    from fishing import sound_detect
+    from fishing.sound_engines import CorrelationEngine, FingerprintEngine
+
+    sample_rate = 48000
+    chunk_size = args.hop
+    start = time.perf_counter()
+    template, _ = sound_detect.load_cached_template(args.template, sample_rate)
+    print(f"Template geladen in {time.perf_counter() - start:.2f}s ({len(template)} Samples)")
+
+    rng = np.random.default_rng(args.seed)
+    stream, events = make_sound_stream(template, sample_rate, args.duration, args.events, args.noise, rng)
+
+    engines = {
+        "legacy (signal.correlate)": LegacyCorrelation(template, 60.0),
+        "correlation raw": CorrelationEngine(template, chunk_size, 60.0),
+        "correlation normalized": CorrelationEngine(template, chunk_size, sound_detect.DEFAULT_NORMALIZED_THRESHOLD,
+                                                    normalized=True),
+        "fingerprint": FingerprintEngine(template, sample_rate, sound_detect.DEFAULT_FINGERPRINT_THRESHOLD),
+    }
+    if args.extra_templates:
+        # Leicht gestauchte/gestreckte Varianten als weitere Templates: kostet nur den Vergleich, nicht die FFT
+        variants = [template] + [stretch(template, f) for f in np.linspace(0.9, 1.1, args.extra_templates)]
+        count = len(variants)
+        engines[f"correlation norm. x{count}"] = CorrelationEngine(
+            variants, chunk_size, sound_detect.DEFAULT_NORMALIZED_THRESHOLD, normalized=True)
+        engines[f"fingerprint x{count}"] = FingerprintEngine(
+            variants, sample_rate, sound_detect.DEFAULT_FINGERPRINT_THRESHOLD)
+
+    print(f"{len(events)} Events, Gains {', '.join(f'{g:.2f}' for _, _, g in events)}, Rauschen {args.noise}")
+    print(f"{'Engine':>26} {'CPU ms/Hop':>12} {'max ms':>7} {'Treffer':>8} {'Fehlalarm':>9} {'Latenz ms':>10}")
+    for name, engine in engines.items():
+        engine.reset()
+        scores = []
+        cpu = []
+        for i in range(len(stream) // chunk_size):
+            block = stream[i * chunk_size:(i + 1) * chunk_size]
+            t0 = time.process_time()
+            scores.append(engine.process(block))
+            cpu.append(time.process_time() - t0)
+        latencies, false_alarms = evaluate_detections(scores, engine.threshold, chunk_size, events, sample_rate)
+        mean_latency = f"{np.mean(list(latencies.values())) * 1000:10.0f}" if latencies else f"{'-':>10}"
+        print(f"{name:>26} {np.mean(cpu) * 1000:12.3f} {np.max(cpu) * 1000:7.2f} "
+              f"{len(latencies):>4}/{len(events):<3} {false_alarms:9d} {mean_latency}")
+        record("sound", engine=name, hop=chunk_size, noise=args.noise, cpu_ms_per_hop=float(np.mean(cpu)) * 1000,
+               max_ms=float(np.max(cpu)) * 1000, hits=len(latencies), events=len(events),
+               false_alarms=false_alarms,
+               latency_ms=float(np.mean(list(latencies.values()))) * 1000 if latencies else None)
+
+
+def bench_convert(args):
+    """BGRA -> BGR wie in match_templates: neuer Puffer, wiederverwendeter Puffer, nur die Suchregion."""
+    rng = np.random.default_rng(args.seed)
+    roi_w, roi_h = ROI_SIZE
+    print(f"{'Auflösung':>10} {'Variante':>22} {'ms':>8}")
+    for width, height in parse_resolutions(args.resolutions):
+        # Wie MSS: BGRA-Sicht auf einen Bytepuffer
+        raw = rng.integers(0, 256, width * height * 4, dtype=np.uint8).tobytes()
+        frame = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+        converter = FrameConverter()
+        x0, y0 = (width - roi_w) // 2, (height - roi_h) // 2
+
+        variants = {
+            "cvtColor (neu)": lambda: cv.cvtColor(frame, cv.COLOR_BGRA2BGR),
+            "FrameConverter": lambda: converter.to_bgr(frame),
+            f"FrameConverter ROI {roi_w}x{roi_h}": lambda: converter.to_bgr(frame[y0:y0 + roi_h, x0:x0 + roi_w]),
+            "Pyramide (Grobstufe)": lambda: FramePyramid(converter.to_bgr(frame)).level(0.25),
+        }
+        for name, fn in variants.items():
+            t, _ = time_call(fn, args.repeat)
+            print(f"{width}x{height:<5} {name:>22} {t * 1000:8.3f}")
+            record("convert", resolution=f"{width}x{height}", variant=name, ms=t * 1000)
+
+
+# Beleuchtung des ganzen Frames (Template inklusive): Kontrast, Helligkeit, Faktoren für B, G, R
+LIGHTING = {
+    "normal": (1.0, 0, (1.0, 1.0, 1.0)),
+    "dunkel": (0.5, 0, (1.0, 1.0, 1.0)),
+    "hell": (1.2, 40, (1.0, 1.0, 1.0)),
+    "nacht": (0.6, 10, (1.3, 0.9, 0.6)),
+}
+
+
+def apply_lighting(frame, contrast, brightness, channel_gain):
+    lit = frame.astype(np.float32) * contrast + brightness
+    lit *= np.array(channel_gain, dtype=np.float32)
+    return np.clip(lit, 0, 255).astype(np.uint8)
+
+
+def bench_features(args):
+    """Merkmals-Modi wie in match_templates: Umwandlung des BGRA-Frames plus Pyramiden-Matching, Trefferquote pro Licht."""
+    rng = np.random.default_rng(args.seed)
+    templates = load_asset_templates()
+    names = list(templates.keys())
+    width, height = parse_resolutions(args.resolution)[0]
+    converter = FrameConverter()
+
+    # Pro Template und Licht args.frames Frames, für alle Modi dieselben
+    cases = []
+    for name in names:
+        distractors = [templates[n] for n in names if n != name][:3]
+        for _ in range(args.frames):
+            frame, loc = make_frame(width, height, templates[name], distractors, rng)
+            for light, params in LIGHTING.items():
+                cases.append((name, light, cv.cvtColor(apply_lighting(frame, *params), cv.COLOR_BGR2BGRA), loc))
+
+    print(f"{'Modus':>6} {'Umwandlung ms':>14} {'Matching ms':>12} " + " ".join(f"{light:>7}" for light in LIGHTING))
+    for mode in FEATURE_MODES:
+        prepared = {name: feature_image(t, mode) for name, t in templates.items()}
+        hits = {light: 0 for light in LIGHTING}
+        convert_total = match_total = 0.0
+        for name, light, frame, (tx, ty) in cases:
+            t_conv, img = time_call(lambda: converter.to_features(frame, mode), args.repeat)
+            t_match, (_, loc) = time_call(lambda: match_pyramid(FramePyramid(img), prepared[name]), args.repeat)
+            convert_total += t_conv
+            match_total += t_match
+            hits[light] += abs(loc[0] - tx) <= 2 and abs(loc[1] - ty) <= 2
+        n = len(cases)
+        per_light = len(names) * args.frames
+        print(f"{mode:>6} {convert_total / n * 1000:14.2f} {match_total / n * 1000:12.2f} "
+              + " ".join(f"{hits[light]:>3}/{per_light:<3}" for light in LIGHTING))
+        record("features", resolution=f"{width}x{height}", mode=mode, convert_ms=convert_total / n * 1000,
+               match_ms=match_total / n * 1000, hits=hits, cases_per_lighting=per_light)
+
+
+def bench_motion(args):
+    """Bewegungserkennung pro Frame: Ausschnitt um den Köder vs. Differenz über den ganzen Frame."""
+    rng = np.random.default_rng(args.seed)
+    template = next(iter(load_asset_templates().values()))
+    print(f"{'Auflösung':>10} {'Variante':>22} {'ms':>8} {'max. FPS':>9}")
+    for width, height in parse_resolutions(args.resolutions):
+        frames = [rng.integers(0, 256, (height, width, 4), dtype=np.uint8) for _ in range(2)]
+        x, y, w, h = lure_patch(((width - template.shape[1]) // 2, (height - template.shape[0]) // 2),
+                                template.shape, (height, width))
+        variants = {
+            f"Ausschnitt {w}x{h}": lambda f: f[y:y + h, x:x + w],
+            "ganzer Frame": lambda f: f,
+        }
+        for name, crop in variants.items():
+            detector = MotionDetector()
+            detector.update(crop(frames[1]), 0.0)
+            step = iter(range(1, 1 << 30))
+
+            def update():
+                i = next(step)
+                detector.update(crop(frames[i % 2]), float(i))
+
+            t, _ = time_call(update, args.repeat)
+            print(f"{width}x{height:<5} {name:>22} {t * 1000:8.3f} {1 / t:9.0f}")
+            record("motion", resolution=f"{width}x{height}", variant=name, ms=t * 1000)
+
+
+def bench_loading(args):
+    """Kaltstart- und Cache-Zeiten für Köder-Templates und das Biss-Geräusch."""
+    from fishing import template_store
+
+    names = [f[:-4] for f in sorted(os.listdir(ASSETS_PATH)) if f.endswith(".png")]
+
+    template_store.clear()
+    start = time.perf_counter()
+    template_store.preload(names)
+    cold = time.perf_counter() - start
+    warm, _ = time_call(lambda: template_store.preload(names), args.repeat)
+    print(f"Templates ({len(names)}): kalt {cold * 1000:.1f} ms, aus Cache {warm * 1000:.3f} ms")
+    record("loading", item="templates", count=len(names), cold_ms=cold * 1000, warm_ms=warm * 1000)
+
+    start = time.perf_counter()
+    from fishing import sound_detect
+    import_time = time.perf_counter() - start
+    start = time.perf_counter()
+    sound_detect.load_audio_template(args.template, 48000)
+    first = time.perf_counter() - start
+    again, _ = time_call(lambda: sound_detect.load_audio_template(args.template, 48000), args.repeat)
+    print(f"Audio-Template: Import {import_time * 1000:.0f} ms, erstes Laden {first * 1000:.0f} ms, "
+          f"erneut {again * 1000:.0f} ms")
+    record("loading", item="audio_template", import_ms=import_time * 1000, first_ms=first * 1000,
+           again_ms=again * 1000)
+
+    # Mit Datei-Cache: der erste Aufruf legt ihn ggf. an, danach nur noch mmap ohne librosa
+    sound_detect.load_cached_template(args.template, 48000)
+    cached, _ = time_call(lambda: sound_detect.load_cached_template(args.template, 48000), args.repeat)
+    detector, _ = time_call(lambda: sound_detect.SoundDetector(device_id=0), args.repeat)
+    print(f"Audio-Template aus Cache {cached * 1000:.1f} ms, SoundDetector() {detector * 1000:.1f} ms")
+    record("loading", item="audio_template_cached", cached_ms=cached * 1000, detector_init_ms=detector * 1000)
+
+
+def bench_startup(args):
+    """Import-Zeit der Einstiegspunkte, jeweils in einem frischen Python-Prozess."""
+    print(f"{'Modul':>24} {'beste ms':>9} {'Ø ms':>8}  schwere Module")
+    for module in args.modules.split(","):
+        code = STARTUP_PROBE.format(src=SRC_PATH, module=module, heavy=HEAVY_MODULES)
+        times = []
+        heavy = []
+        for _ in range(args.repeat):
+            out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=SRC_PATH)
+            if out.returncode != 0:
+                print(f"{module:>24} Fehler: {out.stderr.strip().splitlines()[-1]}")
+                break
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            times.append(result["seconds"])
+            heavy = result["heavy"]
+        if not times:
+            continue
+        print(f"{module:>24} {min(times) * 1000:9.1f} {np.mean(times) * 1000:8.1f}  {', '.join(heavy) or '-'}")
+        record("startup", module=module, best_ms=min(times) * 1000, mean_ms=float(np.mean(times)) * 1000,
+               heavy=heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WoWFisher Benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", default="", help="Ergebnisse als JSON-Zeilen anhängen (Pfad oder - für stdout)")
+
+    p_match = sub.add_parser("matching", parents=[common], help="Brute-Force vs. Pyramiden-Matching auf den Asset-PNGs")
+    p_match.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS)
+    p_match.add_argument("--repeat", type=int, default=5)
+    p_match.add_argument("--seed", type=int, default=1)
+    p_match.add_argument("--min-confidence", type=float, default=0.5, help="Schwelle des FishingAgent (MIN_CONFIDENCE)")
+    p_match.set_defaults(func=bench_matching)
+
+    p_multi = sub.add_parser("multi", parents=[common], help="Seriell vs. Thread-Pool bei mehreren Templates pro Gebiet")
+    p_multi.add_argument("--resolution", default="1920x1080")
+    p_multi.add_argument("--counts", default="1,2,4,8")
+    p_multi.add_argument("--repeat", type=int, default=5)
+    p_multi.add_argument("--seed", type=int, default=1)
+    p_multi.add_argument("--min-confidence", type=float, default=0.5, help="Schwelle des FishingAgent (MIN_CONFIDENCE)")
+    p_multi.set_defaults(func=bench_multi)
+
+    p_sound = sub.add_parser("sound", parents=[common], help="CPU und Erkennungslatenz der Sound-Engines auf synthetischem Audio")
+    p_sound.add_argument("--template", default=os.path.join(ASSETS_PATH, "Catchsound.mp3"))
+    p_sound.add_argument("--duration", type=float, default=60.0)
+    p_sound.add_argument("--events", type=int, default=6)
+    p_sound.add_argument("--noise", type=float, default=0.05)
+    p_sound.add_argument("--hop", type=int, default=1024, help="Samples pro Verarbeitungsschritt")
+    p_sound.add_argument("--extra-templates", type=int, default=3,
+                         help="Zusätzliche Template-Varianten für die Mehrfach-Engines (0 = aus)")
+    p_sound.add_argument("--seed", type=int, default=1)
+    p_sound.set_defaults(func=bench_sound)
+
+    p_convert = sub.add_parser("convert", parents=[common], help="BGRA->BGR-Umwandlung und Pyramidenaufbau pro Frame")
+    p_convert.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS)
+    p_convert.add_argument("--repeat", type=int, default=20)
+    p_convert.add_argument("--seed", type=int, default=1)
+    p_convert.set_defaults(func=bench_convert)
+
+    p_features = sub.add_parser("features", parents=[common], help="Matching auf Farbe, Graustufen oder Kanten: Zeit und Trefferquote")
+    p_features.add_argument("--resolution", default="1920x1080")
+    p_features.add_argument("--frames", type=int, default=3, help="Frames pro Template und Beleuchtung")
+    p_features.add_argument("--repeat", type=int, default=3)
+    p_features.add_argument("--seed", type=int, default=1)
+    p_features.set_defaults(func=bench_features)
+
+    p_motion = sub.add_parser("motion", parents=[common], help="Bewegungserkennung: Köder-Ausschnitt vs. ganzer Frame")
+    p_motion.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS)
+    p_motion.add_argument("--repeat", type=int, default=50)
+    p_motion.add_argument("--seed", type=int, default=1)
+    p_motion.set_defaults(func=bench_motion)
+
+    p_loading = sub.add_parser("loading", parents=[common], help="Laden der Templates und des MP3-Geräuschs")
+    p_loading.add_argument("--template", default=os.path.join(ASSETS_PATH, "Catchsound.mp3"))
+    p_loading.add_argument("--repeat", type=int, default=3)
+    p_loading.set_defaults(func=bench_loading)
+
+    p_startup = sub.add_parser("startup", parents=[common], help="Import-Zeit von gui.py/main.py in frischen Prozessen")
+    p_startup.add_argument("--modules", default="gui,main,fishing.fishing_agent")
+    p_startup.add_argument("--repeat", type=int, default=5)
+    p_startup.set_defaults(func=bench_startup)
+
+    sub.add_parser("all", parents=[common], help="Alle Benchmarks mit Standardwerten").set_defaults(func=None)
+
+    args = parser.parse_args()
+    if args.func is None:
+        # "loading" zuerst, damit die Kaltstart-Zeiten nicht von den anderen Läufen profitieren
+        for name in ("startup", "loading", "convert", "motion", "features", "matching", "multi", "sound"):
+            print(f"\n=== {name} ===")
+            sub_args = parser.parse_args([name])
+            sub_args.func(sub_args)
+    else:
+        args.func(args)
+
+    if args.json:
+        write_results(args.json)
+
+
+if __name__ == "__main__":
+    main()
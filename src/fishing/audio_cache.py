@@ -0,0 +1,48 @@
+import hashlib
+import os
+import numpy as np
+
+# Vorverarbeitete Audio-Templates und ihre Spektren, als .npy (per mmap geladen)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "cache")
+# Bei Änderungen an der Vorverarbeitung erhöhen, damit alte Dateien nicht mehr passen
+CACHE_VERSION = 1
+
+
+def source_hash(path):
+    """SHA-1 des Dateiinhalts (die Quelle ist klein, das Lesen kostet kaum etwas)."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def template_key(path, sample_rate, top_db):
+    """Schlüssel für das vorverarbeitete Template: Quelle (Inhalt), Abtastrate, Trim-Einstellung."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{sample_rate}hz-trim{top_db}-v{CACHE_VERSION}-{source_hash(path)[:16]}"
+
+
+def cached(key, build, cache_dir=CACHE_DIR):
+    """
+    Liefert das Array zu key aus dem Cache (memory-mapped, nur lesbar) oder baut es mit build()
+    und legt es ab. Ist der Cache nicht beschreibbar, wird das frisch gebaute Array zurückgegeben.
+    """
+    path = os.path.join(cache_dir, key + ".npy")
+    if os.path.exists(path):
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Cache-Datei {path} unbrauchbar, wird neu erzeugt: {e}")
+
+    array = build()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Erst vollständig schreiben, dann umbenennen: parallele Starts sehen nie eine halbe Datei
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Konnte Cache {path} nicht schreiben: {e}")
+    return array
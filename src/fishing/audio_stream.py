@@ -0,0 +1,199 @@
+import threading
+import time
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Ringpuffer für genau einen Schreiber (Audio-Callback) und einen Leser (Erkennungs-Thread).
+    Ohne Lock: der Schreiber veröffentlicht neue Daten erst nach dem Kopieren über write_count,
+    der Leser merkt sich seine eigene Position. Überholt der Schreiber den Leser, gehen die
+    ältesten Samples verloren (wird in overruns gezählt).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+        self.write_count = 0
+        self.read_count = 0
+        self.overruns = 0
+
+    def write(self, data):
+        n = len(data)
+        if n >= self.capacity:
+            data = data[-self.capacity:]
+            n = self.capacity
+        start = self.write_count % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            self._buf[start:end] = data
+        else:
+            split = self.capacity - start
+            self._buf[start:] = data[:split]
+            self._buf[:end - self.capacity] = data[split:]
+        self.write_count += len(data)
+
+    def available(self):
+        return self.write_count - self.read_count
+
+    def skip_to(self, position):
+        self.read_count = max(self.read_count, position)
+
+    def read_into(self, out):
+        """Füllt out komplett mit den nächsten Samples. False, wenn noch nicht genug da ist."""
+        n = len(out)
+        if self.write_count - self.read_count > self.capacity:
+            self.overruns += 1
+            self.read_count = self.write_count - self.capacity
+        if self.write_count - self.read_count < n:
+            return False
+        start = self.read_count % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            out[:] = self._buf[start:end]
+        else:
+            split = self.capacity - start
+            out[:split] = self._buf[start:]
+            out[split:] = self._buf[:end - self.capacity]
+        self.read_count += n
+        return True
+
+
+def open_input_stream(device, samplerate, blocksize, callback):
+    """Standard-Audioquelle: ein sounddevice.InputStream im Callback-Modus."""
+    import sounddevice as sd
+    return sd.InputStream(device=device, channels=1, samplerate=samplerate,
+                          blocksize=blocksize, dtype='float32', callback=callback)
+
+
+class AudioEngine:
+    """
+    Besitzt für die ganze Session genau einen Eingabe-Stream. Der Callback schreibt nur in den
+    Ringpuffer, ein eigener Thread schiebt die Samples in kleinen Hops durch die Erkennungs-Engine.
+    Wer auf einen Biss wartet, holt sich mit arm() ein Event, das im Moment des Treffers gesetzt wird.
+    """
+
+    def __init__(self, engine, device, sample_rate, hop_size, stream_factory=open_input_stream,
+                 buffer_seconds=2.0, on_score=None):
+        # on_score wird im Erkennungs-Thread für jeden ausgewerteten Hop aufgerufen
+        self.engine = engine
+        self.device = device
+        self.sample_rate = sample_rate
+        self.hop_size = int(hop_size)
+        self.ring = RingBuffer(max(self.hop_size * 4, int(buffer_seconds * sample_rate)))
+        self._stream_factory = stream_factory
+        self._on_score = on_score
+        self._stream = None
+        self._worker = None
+        self._data_ready = threading.Event()
+        self._closed = threading.Event()
+        self._armed = False
+        # Schreibposition beim letzten arm(); der Erkennungs-Thread übernimmt sie selbst
+        self._arm_position = None
+        self._match_event = threading.Event()
+        # True nur bei echtem Treffer; das Event wird auch beim Beenden gesetzt, um Wartende zu wecken
+        self.matched = False
+        # Index des Templates, das den Treffer ausgelöst hat (bei Engines mit mehreren Templates)
+        self.matched_template = 0
+        # Zeitpunkt (time.time) des Treffers, gesetzt vom Erkennungs-Thread
+        self.matched_at = None
+        self._stop_event = None
+        self.peak_score = 0.0
+        self.status_errors = 0
+
+    @property
+    def running(self):
+        return self._stream is not None and not self._closed.is_set()
+
+    def start(self, stop_event=None):
+        """Öffnet den Stream (nur beim ersten Aufruf). Ein gesetztes stop_event beendet die Session von selbst."""
+        if self.running:
+            return
+        self._stop_event = stop_event
+        self._closed.clear()
+        self._stream = self._stream_factory(self.device, self.sample_rate, self.hop_size, self._callback)
+        self._stream.start()
+        self._worker = threading.Thread(target=self._run, name="audio detection", daemon=True)
+        self._worker.start()
+
+    def _callback(self, indata, frames, time_info, status):
+        # Läuft im Audio-Thread: nur kopieren und Bescheid geben
+        if status:
+            self.status_errors += 1
+        self.ring.write(indata[:, 0])
+        self._data_ready.set()
+
+    def arm(self):
+        """Neue Wartephase: ältere Samples verwerfen, Engine zurücksetzen. Gibt das Treffer-Event zurück."""
+        self._armed = False
+        self.matched = False
+        self.matched_at = None
+        self.peak_score = 0.0
+        self._match_event.clear()
+        # Zurücksetzen erledigt der Erkennungs-Thread, damit Engine und Leseposition nur einem Thread gehören
+        self._arm_position = self.ring.write_count
+        self._data_ready.set()
+        return self._match_event
+
+    def take_peak_score(self):
+        """Höchster Score seit dem letzten Aufruf bzw. arm()."""
+        peak, self.peak_score = self.peak_score, 0.0
+        return peak
+
+    def cancel(self):
+        """Weckt einen Wartenden ohne Treffer (z.B. wenn ein anderes Signal den Biss erkannt hat)."""
+        self._match_event.set()
+
+    def disarm(self):
+        self._arm_position = None
+        self._armed = False
+
+    def _run(self):
+        block = np.zeros(self.hop_size, dtype=np.float32)
+        while not self._closed.is_set():
+            if self._stop_event is not None and self._stop_event.is_set():
+                break
+            # Der Callback weckt pro Hop; der Timeout greift nur, wenn das Gerät nichts mehr liefert
+            self._data_ready.wait(0.5)
+            self._data_ready.clear()
+            arm_position = self._arm_position
+            if arm_position is not None:
+                self._arm_position = None
+                self.engine.reset()
+                self.ring.skip_to(arm_position)
+                self._armed = True
+            while self.ring.read_into(block):
+                if not self._armed:
+                    # Zwischen zwei Würfen nichts auswerten, nur den Puffer leeren
+                    continue
+                score = self.engine.process(block)
+                if score > self.peak_score:
+                    self.peak_score = score
+                if self._on_score:
+                    self._on_score(score)
+                if score > self.engine.threshold:
+                    self._armed = False
+                    self.matched_template = getattr(self.engine, "best_template", 0)
+                    self.matched_at = time.time()
+                    self.matched = True
+                    self._match_event.set()
+        self._shutdown()
+
+    def _shutdown(self):
+        self._closed.set()
+        self._match_event.set()
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.stop()
+                stream.close()
+            except Exception as e:
+                print(f"Fehler beim Schließen des Audio-Streams: {e}")
+
+    def close(self):
+        self._closed.set()
+        self._data_ready.set()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join(timeout=2.0)
+        if self._stream is not None:
+            self._shutdown()
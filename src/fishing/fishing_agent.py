@@ -1,130 +1,634 @@
-import cv2 as cv
-import pyautogui
+import math
 import time
 import random
-from threading import Thread
-import os
+from concurrent.futures import as_completed
+from threading import Event, Thread
 from .sound_detect import SoundDetector
+from . import template_store
+from .metrics import Metrics, MOTION_BUCKETS, SCORE_BUCKETS
+from .motion_detect import MOTION_WARMUP, MotionDetector, lure_patch
+from .session_store import SessionStore
+from .timings import AdaptiveTimings
+from .screen_capture import FrameConverter
+from .template_matcher import FEATURE_MODES, FramePyramid, MATCH_ENGINES, get_executor, match_brute, match_pyramid
+
+# Zustände des Angel-Zyklus
+CAST = "CAST"
+LOCATE = "LOCATE"
+WATCH = "WATCH"
+REEL = "REEL"
+STATES = (CAST, LOCATE, WATCH, REEL)
+# Maximale Wartezeit pro Zustand in Sekunden
+STATE_TIMEOUTS = {
+    CAST: 5.0,
+    LOCATE: 5.0,
+    WATCH: 30.0,
+    REEL: 5.0,
+}
+# Zufällige Pause vor dem Auswerfen (min, max)
+CAST_DELAY = (1.0, 2.0)
+CAST_SETTLE_TIME = 3.0
+REEL_DELAY = 1.0
+
+# Gelernte Suchregion: aus so vielen Treffern wird ein Rechteck um die bisherigen Köder gebildet
+LEARN_MIN_HITS = 5
+LEARN_MAX_HITS = 30
+LEARN_MIN_CONFIDENCE = 0.6
+LEARN_MARGIN = 120
+# Standard-Schwellen, pro Gebiet in areas.json überschreibbar (min_confidence, accept_confidence):
+# darunter gilt der Köder als nicht gefunden (sofort neu auswerfen statt bis zum Timeout zu lauschen),
+# liegt der Treffer in der gelernten Region darunter, wird vorher noch der ganze Frame durchsucht
+MIN_CONFIDENCE = 0.5
+# Ab hier ist ein Treffer sicher, restliche Templates und Skalierungen werden nicht mehr abgewartet
+ACCEPT_CONFIDENCE = 0.9
+# Pause vor dem Auswerfen, wenn im letzten Wurf kein Köder gefunden wurde (min, max)
+RECAST_DELAY = (0.3, 0.8)
+# Abstand der Suchen, solange der Köder nach einer gelernten (kürzeren) Wartezeit noch nicht sichtbar ist
+LOCATE_POLL_INTERVAL = 0.15
+
+# Skalierungen für match_scales=auto (UI-Skalierung, Auflösung, Kamera-Zoom gegenüber den PNGs)
+SCALE_SEARCH = (0.75, 0.9, 1.0, 1.1, 1.25, 1.5, 1.75, 2.0)
+# Darunter passt die gemerkte Skalierung vermutlich nicht mehr; falsche Größen erreichen oft noch ~0.7
+SCALE_RECHECK_CONFIDENCE = 0.8
+
+# Biss-Signal: Geräusch, Bewegung am Köder, das erste von beiden oder Geräusch nur mit Bewegung
+BITE_SIGNALS = ("audio", "motion", "either", "confirm")
+# "confirm": so viele Sekunden vor oder nach dem Geräusch muss sich der Köder bewegt haben. Erkannt wird
+# das Geräusch erst an seinem Ende, die Bewegung beginnt mit ihm: davor zählt zusätzlich seine Länge
+MOTION_CONFIRM_WINDOW = 1.0
+# Wartezeit auf einen einzelnen Ausschnitt vom Capture-Thread
+MOTION_GRAB_TIMEOUT = 1.0
+# So lange wartet stop() auf das Ende des Fishing-Threads (Session-Datenbank, timings.json schreiben)
+STOP_TIMEOUT = 10.0
 
 class FishingAgent:
-    def __init__(self, main_agent, target_pattern="fishing_target", audio_device_id=None, cast_button="middle"):
+    def __init__(self, main_agent, target_pattern="fishing_target", audio_device_id=None, cast_button="middle", search_region=None, min_confidence=None, accept_confidence=None, match_engine="pyramid", sound_score="normalized", sound_engine="correlation", sound_templates=None, bite_signal="audio", match_scales=None, match_features="bgr", session_db=None, input_device=None, audio_stream_factory=None):
         self.main_agent = main_agent
-        self.sound_detector = SoundDetector(device_id=audio_device_id)
+        # Telemetrie teilen sich Agent, SoundDetector und Capture (MainAgent) pro Session
+        self.metrics = getattr(main_agent, "metrics", None) or Metrics()
+        detector_kwargs = {"stream_factory": audio_stream_factory} if audio_stream_factory else {}
+        self.sound_detector = SoundDetector(device_id=audio_device_id, score_mode=sound_score, engine=sound_engine,
+                                            metrics=self.metrics, templates=sound_templates, **detector_kwargs)
+        # Maus/Tastatur: standardmäßig pyautogui, im Replay ein aufzeichnender Ersatz
+        if input_device is None:
+            import pyautogui as input_device
+        self.input = input_device
         self.cast_button = cast_button
+        # Festes Suchrechteck [x, y, w, h] aus areas.json, sonst wird es gelernt
+        self.search_region = tuple(search_region) if search_region else None
+        self.lure_hits = []
+        self.min_confidence = MIN_CONFIDENCE if min_confidence is None else float(min_confidence)
+        self.accept_confidence = ACCEPT_CONFIDENCE if accept_confidence is None else float(accept_confidence)
+        if match_engine not in MATCH_ENGINES:
+            print(f"Unbekannte Match-Engine '{match_engine}', verwende 'pyramid'.")
+            match_engine = "pyramid"
+        self.match_engine = match_engine
+        if match_features not in FEATURE_MODES:
+            print(f"Unbekannter Merkmals-Modus '{match_features}', verwende 'bgr'.")
+            match_features = "bgr"
+        self.match_features = match_features
+        if bite_signal not in BITE_SIGNALS:
+            print(f"Unbekanntes Biss-Signal '{bite_signal}', verwende 'audio'.")
+            bite_signal = "audio"
+        self.bite_signal = bite_signal
+        # Zu probierende Skalierungen; die beste wird pro Gebiet und Auflösung in scales.json gemerkt
+        if match_scales == "auto":
+            match_scales = SCALE_SEARCH
+        self.match_scales = tuple(sorted(set(float(s) for s in match_scales))) if match_scales else (1.0,)
+        self.target_pattern = target_pattern
+        self.lure_scale = 1.0
         
-        here_path = os.path.dirname(os.path.realpath(__file__))
-        assets_path = os.path.join(here_path, "assets")
-
-        self.fishing_targets = []
         print(f"Lade Templates für Muster: '{target_pattern}'...")
-
-        if os.path.exists(assets_path):
-            for f in os.listdir(assets_path):
-                if f.startswith(target_pattern) and f.endswith(".png"):
-                    path = os.path.join(assets_path, f)
-                    img = cv.imread(path)
-                    if img is not None:
-                        self.fishing_targets.append(img)
-                        print(f"Loaded template: {f}")
+        self.fishing_targets = template_store.get_templates(target_pattern)
         
         if not self.fishing_targets:
              print(f"Warning: No fishing targets found starting with '{target_pattern}'!")
         
         self.fishing_thread = None
         self.lure_location = None
+        # Form des besten Templates und Ausschnitt (x, y, w, h) für die Bewegungserkennung
+        self.lure_shape = None
+        self.lure_patch = None
+        # Zeiten pro Instanz, damit das Replay sie skalieren kann
+        self.cast_delay = CAST_DELAY
+        self.recast_delay = RECAST_DELAY
+        # Im letzten Wurf kein Köder gefunden -> kürzere Pause vor dem nächsten
+        self.fast_recast = False
+        self.cast_settle_time = CAST_SETTLE_TIME
+        self.reel_delay = REEL_DELAY
+        self.locate_poll_interval = LOCATE_POLL_INTERVAL
+        self.state_timeouts = dict(STATE_TIMEOUTS)
+        # Würfe dauerhaft in SQLite (session_db: Pfad, "" = sessions.db im Projektordner, None/"off" = aus)
+        self.area_name = getattr(main_agent, "selected_area_name", None) or template_store.pattern_name(target_pattern)
+        self.store = SessionStore(session_db or None) if session_db is not None and session_db != "off" else None
+        # Aus den bisherigen Würfen des Gebiets gelernte Wartezeiten (die Konstanten oben sind die Obergrenzen)
+        self.timings = AdaptiveTimings(template_store.pattern_name(target_pattern))
+        self.motion_confirm_window = MOTION_CONFIRM_WINDOW
+        # Länge des längsten Biss-Geräuschs in Sekunden (Vorlauf für "confirm")
+        self.sound_duration = self.sound_detector.template_len / self.sound_detector.SAMPLE_RATE
+        self.motion_grab_timeout = MOTION_GRAB_TIMEOUT
+        self.motion_warmup = MOTION_WARMUP
+        # Capture liefert BGRA; umgewandelt wird nur der durchsuchte Ausschnitt, einmal pro Wurf
+        self.frame_converter = FrameConverter()
+
+        # Zeitmessung der Zustandsmaschine
+        self.casts = 0
+        self.session_start = None
+        self.state_stats = {state: {"count": 0, "total": 0.0, "last": 0.0, "timeouts": 0} for state in STATES}
+        # Messwerte des laufenden Wurfs, in pull_line an die Metriken übergeben
+        self.current_cast = {}
 
     def _should_stop(self):
         """Hilfsfunktion um zu prüfen ob wir stoppen sollen"""
         return not self.main_agent.running
 
+    def _wait(self, seconds):
+        """Wartet mit Unterbrechungsmöglichkeit. False, wenn währenddessen gestoppt wurde."""
+        return not self.main_agent.stop_event.wait(seconds)
+
     def cast_lure(self):
-        if self._should_stop(): return
+        """CAST: kurz zufällig warten, auswerfen und warten bis der Köder liegt."""
+        delay = self.recast_delay if self.fast_recast else self.cast_delay
+        self.fast_recast = False
+        if not self._wait(random.uniform(*delay)): return None
 
         print(f"Casting with {self.cast_button} button!...")
         
         # Check for mouse buttons
         if self.cast_button == "right":
-            pyautogui.rightClick()
+            self.input.rightClick()
         elif self.cast_button == "left":
-            pyautogui.leftClick()
+            self.input.leftClick()
         elif self.cast_button == "middle":
-            pyautogui.middleClick()
+            self.input.middleClick()
         else:
             # Assume it's a keyboard key
             try:
-                pyautogui.press(self.cast_button)
+                self.input.press(self.cast_button)
             except Exception as e:
                 print(f"Error pressing key '{self.cast_button}': {e}")
+        self.current_cast = {"cast": self.casts + 1, "cast_at": time.time(), "timeouts": []}
         
-        # Warten mit Unterbrechungsmöglichkeit
-        for _ in range(30): # 3 Sekunden warten (30 * 0.1s)
-            if self._should_stop(): return
-            time.sleep(0.1)
-            
-        self.find_lure()
+        # Warten, bis der Köder im Wasser liegt (ohne gelernte Zeiten 3 Sekunden)
+        settle = self.timings.settle_time(self.cast_settle_time)
+        self.current_cast["settle"] = settle
+        if not self._wait(settle): return None
+        return LOCATE
 
-    def find_lure(self):
-        if self._should_stop(): return
+    def get_search_region(self, frame_shape, scale=1.0):
+        """Liefert das Suchrechteck (x0, y0, x1, y1) im Frame; None = ganzer Frame. scale: größte Template-Skalierung."""
+        frame_h, frame_w = frame_shape[:2]
+
+        if self.search_region:
+            x, y, w, h = self.search_region
+            x0, y0, x1, y1 = x, y, x + w, y + h
+        elif len(self.lure_hits) >= LEARN_MIN_HITS:
+            xs = [p[0] for p in self.lure_hits]
+            ys = [p[1] for p in self.lure_hits]
+            x0, y0 = min(xs) - LEARN_MARGIN, min(ys) - LEARN_MARGIN
+            x1, y1 = max(xs) + LEARN_MARGIN, max(ys) + LEARN_MARGIN
+        else:
+            return None
+
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(frame_w, int(x1)), min(frame_h, int(y1))
+
+        # Region muss mindestens so groß wie das größte Template sein
+        max_th = max((t.shape[0] for t in self.fishing_targets), default=0) * scale
+        max_tw = max((t.shape[1] for t in self.fishing_targets), default=0) * scale
+        if x1 - x0 < max_tw or y1 - y0 < max_th:
+            return None
+        return (x0, y0, x1, y1)
+
+    def match_templates(self, img, region=None, scales=(1.0,), thorough=True):
+        """
+        Sucht alle Templates in img (optional nur im Rechteck region) in allen Skalierungen scales
+        und gibt (max_val, loc) zurück. Die Skalierung des besten Treffers steht danach in lure_scale.
+        Ohne thorough entfällt die vollständige Suche, wenn die Pyramide nichts Sicheres findet.
+        """
+        offset_x, offset_y = 0, 0
+        if region is not None:
+            x0, y0, x1, y1 = region
+            img = img[y0:y1, x0:x1]
+            offset_x, offset_y = x0, y0
+        # Einmal pro Wurf in Farbe, Graustufen oder Kanten umwandeln; die Templates liegen passend vor
+        img = self.frame_converter.to_features(img, self.match_features)
+        frame = FramePyramid(img)
+
+        # Größere Varianten als der Ausschnitt (oder zu kleine) fallen weg; Originalgröße zuerst,
+        # damit ein sicherer Treffer die übrigen Skalierungen möglichst früh überflüssig macht
+        variants = [v for v in (t.scaled(s) for s in sorted(scales, key=lambda s: abs(math.log(s)))
+                                for t in self.fishing_targets)
+                    if v is not None and v.shape[0] <= img.shape[0] and v.shape[1] <= img.shape[1]]
+
+        # Kein Brute-Force-Fallback pro Template: fehlende Templates (Nacht-Köder am Tag, falsche Skalierungen)
+        # würden sonst bei jedem Wurf den ganzen Frame durchsuchen. Stattdessen unten ein Vollscan,
+        # wenn kein Template den Köder sicher gefunden hat
+        probing = len(scales) > 1
+
+        def match_one(target):
+            image, coarse = target.features(self.match_features)
+            if self.match_engine == "pyramid":
+                return match_pyramid(frame, image, coarse_template=coarse, fallback_confidence=None)
+            return match_brute(img, image)
+
+        def results():
+            # (Variante, Funktion für das Ergebnis) in der Reihenfolge, in der sie fertig werden
+            if len(variants) <= 1:
+                for target in variants:
+                    yield target, lambda target=target: match_one(target)
+                return
+            futures = {get_executor().submit(match_one, t): t for t in variants}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result
+            finally:
+                # Nach einem frühen Abbruch: noch nicht gestartete Varianten verwerfen
+                for future in futures:
+                    future.cancel()
 
         best_max_val = -1
         best_loc = None
-        
-        if self.main_agent.cur_img is None:
-            return
+        best_target = None
 
-        for target in self.fishing_targets:
+        pending = results()
+        for target, result in pending:
             try:
-                res = cv.matchTemplate(self.main_agent.cur_img, target, cv.TM_CCOEFF_NORMED)
-                _, max_val, _, max_loc = cv.minMaxLoc(res)
+                max_val, max_loc = result()
                 
                 if max_val > best_max_val:
                     best_max_val = max_val
-                    best_loc = max_loc
+                    best_loc = (max_loc[0] + offset_x, max_loc[1] + offset_y)
+                    best_target = target
             except Exception as e:
                 print(f"Error matching template: {e}")
                 continue
+            if best_max_val >= self.accept_confidence:
+                self.metrics.inc("match_early_exit")
+                break
+        pending.close()
+
+        # Grobstufe hat vermutlich daneben gelegen (kontrastarme Templates): alle Templates vollständig
+        # durchsuchen, beim Probieren mehrerer Skalierungen nur die beste Variante
+        if thorough and self.match_engine == "pyramid" and best_target is not None and best_max_val < self.min_confidence:
+            self.metrics.inc("match_fallback")
+            retry = [best_target] if probing else variants
+
+            def brute_one(target):
+                return match_brute(img, target.features(self.match_features)[0])
+
+            for target, (max_val, max_loc) in zip(retry, get_executor().map(brute_one, retry)):
+                if max_val > best_max_val:
+                    best_max_val = max_val
+                    best_loc = (max_loc[0] + offset_x, max_loc[1] + offset_y)
+                    best_target = target
+        if best_target is not None:
+            self.lure_shape = best_target.shape
+            self.lure_scale = best_target.scale
+
+        return best_max_val, best_loc
+
+    def scales_for(self, frame_shape):
+        """Skalierungen für diesen Wurf: die gemerkte für Gebiet und Auflösung, sonst alle aus match_scales."""
+        if len(self.match_scales) == 1:
+            return self.match_scales
+        cached = template_store.get_scale(template_store.scale_key(self.target_pattern, frame_shape))
+        return (cached,) if cached is not None else self.match_scales
+
+    def locate(self, img, thorough=True):
+        """
+        Sucht den Köder in img: Suchregion und gemerkte Skalierung, bei thorough mit Rückfall auf den
+        ganzen Frame bzw. alle Skalierungen. Gibt (max_val, loc) zurück.
+        """
+        scales = self.scales_for(img.shape)
+        region = self.get_search_region(img.shape, max(scales))
+        # Frühe Suchen (ohne thorough) lernen Region und Skalierung nur aus sicheren Treffern, wie find_lure
+        learn_min = LEARN_MIN_CONFIDENCE if thorough else self.accept_confidence
+        best_max_val, best_loc = self.match_templates(img, region, scales, thorough)
+
+        # Region kann daneben liegen (Spieler hat sich bewegt, search_region veraltet) -> ganzer Frame
+        if thorough and region is not None and best_max_val < self.min_confidence:
+            if self.search_region:
+                print("Kein sicherer Treffer in search_region, durchsuche ganzen Frame...")
+            else:
+                print("Kein sicherer Treffer in gelernter Region, durchsuche ganzen Frame...")
+                self.lure_hits.clear()
+            best_max_val, best_loc = self.match_templates(img, None, scales)
+
+        # Gemerkte Skalierung passt nicht mehr (UI-Skalierung oder Zoom geändert) -> alle probieren
+        if thorough and len(scales) < len(self.match_scales) and best_max_val < SCALE_RECHECK_CONFIDENCE:
+            print(f"Kein sicherer Treffer bei Skalierung {scales[0]:g}, probiere {len(self.match_scales)} Skalierungen...")
+            scales = self.match_scales
+            best_max_val, best_loc = self.match_templates(img, self.get_search_region(img.shape, max(scales)), scales)
+
+        if len(scales) > 1 and best_loc is not None and best_max_val >= learn_min:
+            print(f"Skalierung {self.lure_scale:g} gefunden, wird für dieses Gebiet gemerkt.")
+            template_store.set_scale(template_store.scale_key(self.target_pattern, img.shape), self.lure_scale)
 
+        if best_loc is not None and best_max_val >= learn_min:
+            self.lure_hits.append(best_loc)
+            del self.lure_hits[:-LEARN_MAX_HITS]
+        return best_max_val, best_loc
+
+    def find_lure(self):
+        """LOCATE: Köder im frischen Screenshot suchen und die Maus darauf bewegen."""
+        if self._should_stop(): return None
+
+        # Nach einer gelernten, kürzeren Wartezeit wird wiederholt gesucht, höchstens bis zu dem
+        # Zeitpunkt, an dem ohne gelernte Zeiten gesucht worden wäre (dann mit allen Rückfällen)
+        cast_at = self.current_cast.get("cast_at")
+        search_until = cast_at + self.cast_settle_time if cast_at else 0.0
+        attempts = 0
+        while True:
+            attempts += 1
+            # Frischen Screenshot anfordern (im Modus "on_demand" wird nur jetzt einer gemacht)
+            requested = time.time()
+            img = self.main_agent.request_frame(timeout=self.state_timeouts[LOCATE])
+            if img is not None:
+                self.metrics.observe("frame_wait", time.time() - requested)
+            if img is None:
+                # request_frame kehrt auch beim Stoppen ohne Bild zurück: das ist kein Timeout
+                if self._should_stop(): return None
+                print("Kein Screenshot erhalten.")
+                self._count_timeout(LOCATE)
+                return REEL
+
+            final = requested >= search_until
+            best_max_val, best_loc = self.locate(img, thorough=final)
+            # Vor der festen Wartezeit zählt nur ein sicherer Treffer: ein schwacher (Fehltreffer, Köder
+            # noch im Flug) würde die Maus falsch setzen und die gelernte Wartezeit immer weiter drücken
+            needed = self.min_confidence if final else self.accept_confidence
+            found = best_loc is not None and best_max_val >= needed
+            if found or final:
+                break
+            if not self._wait(self.locate_poll_interval): return None
+
+        self.current_cast["locate_attempts"] = attempts
+        if found and cast_at and best_max_val >= LEARN_MIN_CONFIDENCE:
+            self.timings.record_visible(requested - cast_at)
         print(f"Best match confidence: {best_max_val}")
+        if best_loc is not None and best_max_val < self.min_confidence:
+            # Ein schwacher Treffer schickt die Maus irgendwohin und kostet danach den ganzen WATCH-Timeout
+            print(f"Köder nicht sicher erkannt ({best_max_val:.2f} < {self.min_confidence:.2f}).")
+            self.metrics.inc("lure_rejected")
+            self.current_cast["rejected"] = True
+            best_loc = None
+        self.metrics.observe("match_confidence", best_max_val, SCORE_BUCKETS)
+        self.current_cast["confidence"] = float(best_max_val)
+        self.current_cast["lure"] = list(best_loc) if best_loc else None
+        self.current_cast["scale"] = self.lure_scale
         self.lure_location = best_loc
-        self.move_to_lure()
+        self.lure_patch = lure_patch(best_loc, self.lure_shape, img.shape) if best_loc else None
+        return self.move_to_lure()
 
     def move_to_lure(self):
-        if self._should_stop(): return
+        if self._should_stop(): return None
 
         if self.lure_location:
-            # Bevor wir die Maus bewegen, nochmal prüfen
-            if self._should_stop(): return
-            
-            pyautogui.moveTo(self.lure_location[0] + 25, self.lure_location[1], .45, pyautogui.easeOutQuad)
-            self.watch_lure()
-        else:
-            print("Warning: Lure not found. Recasting...")
-            self.pull_line()
+            offset = int(25 * self.lure_scale)
+            self.input.moveTo(self.lure_location[0] + offset, self.lure_location[1], .45, self.input.easeOutQuad)
+            self._cast_timing("cast_to_locate", "cast_at", "located_at")
+            return WATCH
+
+        print("Warning: Lure not found. Recasting...")
+        self.fast_recast = True
+        return REEL
 
     def watch_lure(self):
-        if self._should_stop(): return
+        """WATCH: auf den Biss warten (Geräusch, Bewegung am Köder oder beides, siehe bite_signal)."""
+        if self._should_stop(): return None
 
-        print("Beobachte Köder via Sound...")
-        
-        # Wir übergeben eine Lambda-Funktion, damit der SoundDetector weiß, wann er abbrechen soll
-        detected = self.sound_detector.wait_for_sound(
-            timeout=30.0, 
-            stop_callback=lambda: not self.main_agent.running
-        )
+        # Gelernte Frist ab dem Auswerfen; ohne genug Würfe die feste Obergrenze
+        since_cast = time.time() - self.current_cast.get("cast_at", time.time())
+        timeout = self.timings.watch_timeout(since_cast, self.state_timeouts[WATCH])
+        learned = timeout < self.state_timeouts[WATCH]
+        self.current_cast["watch_timeout"] = timeout
+        # Ohne gefundenen Köder gibt es keinen Ausschnitt zum Beobachten
+        signal = self.bite_signal if self.lure_patch is not None else "audio"
+        if signal == "audio":
+            print("Beobachte Köder via Sound...")
+            # Wir übergeben das Stop-Event, damit der SoundDetector sofort abbrechen kann
+            detected = self.sound_detector.wait_for_sound(
+                timeout=timeout,
+                stop_event=self.main_agent.stop_event
+            )
+            source = "audio" if detected else None
+            bite_at = self.sound_detector.last_match_at
+        elif signal == "motion":
+            print("Beobachte Köder via Bewegung...")
+            moved_at = self.watch_motion(MotionDetector(warmup=self.motion_warmup), timeout)
+            source = "motion" if moved_at is not None else None
+            bite_at = self._wall_time(moved_at)
+        else:
+            print(f"Beobachte Köder via Sound und Bewegung ({signal})...")
+            source, bite_at = self.watch_combined(signal, timeout)
         
-        if self._should_stop(): return # Falls während des Wartens gestoppt wurde
+        if self._should_stop(): return None # Falls während des Wartens gestoppt wurde
 
-        if not detected:
+        detected = source is not None
+        if signal != "motion":
+            self.current_cast["peak_score"] = self.sound_detector.last_peak_score
+        self.current_cast["detected"] = detected
+        if detected:
+            self.metrics.inc("bites")
+            self.metrics.inc(f"bite_source.{source}")
+            self.current_cast["bite_source"] = source
+            # Zeitpunkt, zu dem der Detektor ausgelöst hat: die Bestätigung zählt zu bite_to_reel
+            self._cast_timing("locate_to_bite", "located_at", "bite_at", at=bite_at)
+            if "cast_at" in self.current_cast:
+                self.timings.record_bite(self.current_cast["bite_at"] - self.current_cast["cast_at"])
+        else:
             print("Timeout oder Abbruch!")
+            self._count_timeout(WATCH)
+            if learned and "cast_at" in self.current_cast:
+                self.timings.record_timeout(time.time() - self.current_cast["cast_at"])
+
+        return REEL
+
+    def watch_motion(self, detector, timeout, done=None, stop_on_motion=True):
+        """Beobachtet den Ausschnitt um den Köder. Gibt den Zeitpunkt der ersten Bewegung oder None zurück."""
+        patch = self.lure_patch
+
+        def grab():
+            return self.main_agent.request_frame(timeout=self.motion_grab_timeout, region=patch)
+
+        moved_at = detector.watch(grab, timeout, self.main_agent.stop_event, done=done, stop_on_motion=stop_on_motion)
+        self.metrics.observe("motion_peak", detector.peak, MOTION_BUCKETS)
+        self.current_cast["motion_peak"] = detector.peak
+        if moved_at is not None:
+            print(f"\n>>> BEWEGUNG AM KÖDER! (x{detector.peak:.1f} über Schwelle) <<<\n")
+        return moved_at
+
+    def watch_combined(self, signal, timeout):
+        """
+        Geräusch und Bewegung gleichzeitig: die Bewegung läuft in einem eigenen Thread.
+        "either": was zuerst kommt, gilt. "confirm": ein Geräusch zählt nur mit Bewegung kurz davor oder danach.
+        Gibt (Quelle des Bisses ("audio", "motion", "audio+motion") oder None, Zeitpunkt als time.time()) zurück.
+        """
+        detector = MotionDetector(warmup=self.motion_warmup)
+        done = Event()
+        motion_hit = Event()
+
+        def motion():
+            if self.watch_motion(detector, timeout, done, stop_on_motion=signal == "either") is not None:
+                if signal == "either":
+                    # Zuerst das Event, dann wecken: so geht das Abbrechen auch vor arm() nicht verloren
+                    motion_hit.set()
+                    self.sound_detector.cancel_wait()
 
-        self.pull_line()
+        watcher = Thread(target=motion, name="motion watcher", daemon=True)
+        watcher.start()
+        stop_event = self.main_agent.stop_event
+        try:
+            if signal == "either":
+                heard = self.sound_detector.wait_for_sound(timeout=timeout, stop_event=stop_event,
+                                                           cancel_event=motion_hit)
+                if heard:
+                    return "audio", self.sound_detector.last_match_at
+                if motion_hit.is_set():
+                    return "motion", self._wall_time(detector.detections[0])
+                return None, None
+
+            deadline = time.monotonic() + timeout
+            while not stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, None
+                if not self.sound_detector.wait_for_sound(timeout=remaining, stop_event=stop_event):
+                    return None, None
+                heard_at = time.monotonic()
+                if self._motion_near(detector, heard_at, self.sound_duration + self.motion_confirm_window,
+                                     self.motion_confirm_window, watcher):
+                    return "audio+motion", self.sound_detector.last_match_at
+                print("Geräusch ohne Bewegung am Köder, ignoriert.")
+                self.metrics.inc("bites_unconfirmed")
+            return None, None
+        finally:
+            done.set()
+            watcher.join(timeout=1.0)
+
+    @staticmethod
+    def _wall_time(monotonic_at):
+        """Zeitpunkt aus time.monotonic() (MotionDetector) in time.time() umrechnen."""
+        if monotonic_at is None:
+            return None
+        return time.time() - (time.monotonic() - monotonic_at)
+
+    @staticmethod
+    def _motion_near(detector, moment, before, after, watcher):
+        """Wartet höchstens bis moment + after auf eine Bewegung zwischen moment - before und moment + after."""
+        while True:
+            # Erst zurücksetzen, dann prüfen: eine Erkennung dazwischen weckt das folgende wait()
+            detector.moved.clear()
+            if any(moment - before <= t <= moment + after for t in detector.detections):
+                return True
+            wait = moment + after - time.monotonic()
+            if wait <= 0 or not watcher.is_alive():
+                return False
+            detector.moved.wait(wait)
 
     def pull_line(self):
-        if self._should_stop(): return
+        """REEL: Schnur einholen (bzw. Wurf abbrechen), danach neu auswerfen."""
+        if self._should_stop(): return None
+
+        self.input.rightClick()
+        self.casts += 1
+        self._finish_cast()
+        if not self._wait(self.reel_delay): return None
+        return CAST
+
+    def _count_timeout(self, state):
+        self.state_stats[state]["timeouts"] += 1
+        self.metrics.inc(f"timeouts.{state}")
+        self.current_cast.setdefault("timeouts", []).append(state)
+
+    def _cast_timing(self, name, since, mark, at=None):
+        """Setzt den Zeitpunkt mark (at, sonst jetzt) im laufenden Wurf und misst die Dauer seit since."""
+        now = time.time() if at is None else at
+        self.current_cast[mark] = now
+        if since in self.current_cast:
+            duration = now - self.current_cast[since]
+            self.current_cast[name] = duration
+            self.metrics.observe(name, duration)
+
+    def _finish_cast(self):
+        if "bite_at" in self.current_cast:
+            self._cast_timing("bite_to_reel", "bite_at", "reel_at")
+        self.metrics.inc("casts")
+        cast = {k: v for k, v in self.current_cast.items() if not k.endswith("_at")}
+        cast["cast"] = self.casts
+        self.metrics.record_cast(cast)
+        if self.store is not None:
+            self.store.add_cast(cast, self.area_name)
+        self.current_cast = {}
+
+    def get_stats(self):
+        """Zeitmessung pro Zustand und Würfe pro Stunde seit dem Start."""
+        elapsed = time.time() - self.session_start if self.session_start else 0.0
+        stats = {
+            "casts": self.casts,
+            "elapsed": elapsed,
+            "casts_per_hour": self.casts / elapsed * 3600 if elapsed > 0 else 0.0,
+            "states": {},
+        }
+        for state, s in self.state_stats.items():
+            stats["states"][state] = {
+                "count": s["count"],
+                "timeouts": s["timeouts"],
+                "last": s["last"],
+                "mean": s["total"] / s["count"] if s["count"] else 0.0,
+            }
+        return stats
+
+    def print_stats(self):
+        stats = self.get_stats()
+        parts = [f"{state} {s['mean']:.2f}s" for state, s in stats["states"].items()]
+        print(f"Würfe: {stats['casts']} ({stats['casts_per_hour']:.0f}/h) | Ø " + ", ".join(parts))
 
-        pyautogui.rightClick()
-        time.sleep(1)
-        self.run()
+    def _loop(self):
+        """Einziger, langlebiger Worker: führt die Zustandsmaschine CAST -> LOCATE -> WATCH -> REEL aus."""
+        handlers = {
+            CAST: self.cast_lure,
+            LOCATE: self.find_lure,
+            WATCH: self.watch_lure,
+            REEL: self.pull_line,
+        }
+        self.session_start = time.time()
+        if self.store is not None:
+            self.store.begin(self.area_name, template_store.pattern_name(self.target_pattern), {
+                "match_engine": self.match_engine,
+                "match_features": self.match_features,
+                "bite_signal": self.bite_signal,
+                "sound_engine": self.sound_detector.ENGINE,
+            })
+        state = CAST
+        try:
+            while state is not None and not self._should_stop():
+                start = time.time()
+                next_state = handlers[state]()
+                duration = time.time() - start
+
+                s = self.state_stats[state]
+                s["count"] += 1
+                s["total"] += duration
+                s["last"] = duration
+                self.metrics.observe(f"state.{state}", duration)
+                # WATCH/LOCATE begrenzen ihre Wartezeit selbst, hier fallen hängende Zustände auf
+                limit = self.state_timeouts[state]
+                if duration > limit + 1.0:
+                    print(f"Warnung: Zustand {state} hat {duration:.1f}s gedauert (Limit {limit:.0f}s).")
+                    self._count_timeout(state)
+
+                if state == REEL and next_state == CAST:
+                    self.print_stats()
+                state = next_state
+        finally:
+            self.sound_detector.close()
+            self.timings.save()
+            if self.store is not None:
+                self.store.close()
+            self.metrics.write_summary()
+            print("Agent gestoppt.")
 
     def run(self):
         if self._should_stop(): 
@@ -134,19 +638,26 @@ class FishingAgent:
         if self.main_agent.cur_img is None:
             print("Image capture not found!")
             return
+
+        if self.fishing_thread is not None and self.fishing_thread.is_alive():
+            return
             
-        print("Starting fishing thread in 1 to 2 seconds...")
-        
-        # Warten mit Check
-        sleep_time = random.uniform(1, 2)
-        start = time.time()
-        while time.time() - start < sleep_time:
-            if self._should_stop(): return
-            time.sleep(0.1)
-        
+        print("Starting fishing thread...")
         self.fishing_thread = Thread(
-            target=self.cast_lure, 
+            target=self._loop, 
             args=(),
             name="fishing thread",
             daemon=True)    
         self.fishing_thread.start()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        Stoppt den Agent und wartet auf das Ende des Fishing-Threads. Beim Beenden des Programms nötig:
+        der Thread ist ein Daemon, ohne join würden ausstehende Würfe, das Session-Ende und timings.json verloren gehen.
+        """
+        self.main_agent.running = False
+        thread = self.fishing_thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+            if thread.is_alive():
+                print("Fishing-Thread reagiert nicht, beende trotzdem.")
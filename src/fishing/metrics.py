@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+
+# Bucket-Grenzen (obere Grenzen, inklusive); alles darüber landet im Überlauf-Bucket
+TIME_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+RAW_SCORE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+FPS_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 60, 120)
+# Bewegung am Köder relativ zur Auslöseschwelle (1.0 = Schwelle)
+MOTION_BUCKETS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+# So viele Würfe bleiben im Speicher (für Export und Anzeige)
+MAX_CASTS = 1000
+
+
+class Histogram:
+    """Histogramm mit festen Buckets: konstanter Speicher, auch über lange Sessions."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def observe(self, value):
+        value = float(value)
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.last = value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Obere Bucket-Grenze, unter der mindestens der Anteil q der Werte liegt (höchstens max)."""
+        if not self.count:
+            return 0.0
+        needed = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= needed:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "bounds": list(self.bounds),
+            "counts": list(self.counts),
+        }
+
+
+class Metrics:
+    """
+    Telemetrie einer Session: Histogramme, Zähler und die letzten Würfe.
+    Wird aus Fishing-, Audio- und Capture-Thread befüllt und aus der GUI gelesen, daher mit Lock.
+    Mit jsonl_path wird jeder Wurf sofort als JSON-Zeile angehängt, write_summary() ergänzt die Histogramme.
+    """
+
+    def __init__(self, jsonl_path=None):
+        self.jsonl_path = jsonl_path
+        self.started = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self.casts = []
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, bounds=TIME_BUCKETS):
+        # bounds gilt nur beim ersten Wert eines Namens
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram(bounds)
+            hist.observe(value)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def get(self, name):
+        return self.histograms.get(name)
+
+    def record_cast(self, cast):
+        """Speichert die Messwerte eines abgeschlossenen Wurfs."""
+        line = {"type": "cast", "time": time.time(), **cast}
+        with self._lock:
+            self.casts.append(line)
+            del self.casts[:-MAX_CASTS]
+        if self.jsonl_path:
+            self._append(json.dumps(line))
+
+    def summary(self):
+        with self._lock:
+            return {
+                "type": "summary",
+                "time": time.time(),
+                "elapsed": time.time() - self.started,
+                "counters": dict(self.counters),
+                "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+            }
+
+    def to_jsonl(self):
+        """Alle gespeicherten Würfe plus Zusammenfassung als JSON-Zeilen."""
+        with self._lock:
+            lines = [json.dumps(c) for c in self.casts]
+        lines.append(json.dumps(self.summary()))
+        return "\n".join(lines) + "\n"
+
+    def write_summary(self):
+        if self.jsonl_path:
+            self._append(json.dumps(self.summary()))
+
+    def _append(self, line):
+        try:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Fehler beim Schreiben der Metriken: {e}")
+
+    def format_status(self):
+        """Kurzfassung für die Statusanzeige der GUI."""
+        def mean(name, fmt, unit="", scale=1.0):
+            h = self.histograms.get(name)
+            return format(h.mean * scale, fmt) + unit if h and h.count else "-"
+
+        with self._lock:
+            casts = self.counters.get("casts", 0)
+            bites = self.counters.get("bites", 0)
+            timeouts = sum(v for k, v in self.counters.items() if k.startswith("timeouts."))
+            if "capture_fps" in self.histograms:
+                capture = f"FPS {mean('capture_fps', '.1f')}"
+            else:
+                capture = f"Frame {mean('frame_wait', '.0f', ' ms', 1000)}"
+            return (
+                f"Würfe {casts} | Bisse {bites} | Timeouts {timeouts}\n"
+                f"Ø Wurf→Köder {mean('cast_to_locate', '.1f', 's')} | Köder→Biss {mean('locate_to_bite', '.1f', 's')}"
+                f" | Biss→Einholen {mean('bite_to_reel', '.2f', 's')}\n"
+                f"Ø Konfidenz {mean('match_confidence', '.2f')} | Score {mean('sound_peak_score', '.2f')}"
+                f" | {capture}"
+            )
@@ -0,0 +1,117 @@
+import threading
+import time
+import cv2 as cv
+
+# Bildrate der Bewegungserkennung; aufgenommen wird nur ein kleiner Ausschnitt um den Köder
+MOTION_FPS = 60
+# Rand um das Köder-Template in Pixeln, damit das Wegtauchen noch im Ausschnitt liegt
+MOTION_MARGIN = 16
+# So lange (Sekunden) wird nach dem Auswerfen nur die Grundunruhe gemessen (Wellen, Wippen)
+MOTION_WARMUP = 0.5
+# Biss: mittlere Differenz zum Vorframe über max(MOTION_MIN_DIFF, Grundunruhe * MOTION_FACTOR)
+MOTION_FACTOR = 4.0
+MOTION_MIN_DIFF = 4.0
+# Gewicht neuer Werte im gleitenden Mittel der Grundunruhe
+MOTION_BASELINE_ALPHA = 0.05
+# So viele (verschiedene) Frames in Folge über der Schwelle, damit ein einzelner Ausreißer nicht auslöst
+MOTION_CONFIRM_FRAMES = 2
+
+
+def lure_patch(lure_location, template_shape, frame_shape, margin=MOTION_MARGIN):
+    """Rechteck (x, y, w, h) um den gefundenen Köder, auf den Frame begrenzt. None, wenn leer."""
+    th, tw = template_shape[:2]
+    frame_h, frame_w = frame_shape[:2]
+    x0, y0 = max(0, int(lure_location[0]) - margin), max(0, int(lure_location[1]) - margin)
+    x1 = min(frame_w, int(lure_location[0]) + tw + margin)
+    y1 = min(frame_h, int(lure_location[1]) + th + margin)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class MotionDetector:
+    """
+    Frame-Differenz auf einem kleinen Ausschnitt um den Köder. Die Grundunruhe des Wassers wird
+    laufend gemittelt; ein Biss ist eine deutlich größere Änderung über mehrere Frames.
+    """
+
+    def __init__(self, fps=MOTION_FPS, warmup=MOTION_WARMUP, factor=MOTION_FACTOR, min_diff=MOTION_MIN_DIFF,
+                 confirm_frames=MOTION_CONFIRM_FRAMES):
+        self.fps = fps
+        self.warmup = warmup
+        self.factor = factor
+        self.min_diff = min_diff
+        self.confirm_frames = confirm_frames
+        # Wird bei jeder erkannten Bewegung gesetzt (und am Ende von watch(), um Wartende zu wecken)
+        self.moved = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self._prev = None
+        self._started = None
+        self._over = 0
+        self.baseline = None
+        self.frames = 0
+        # Höchste Änderung relativ zur Schwelle (1.0 = Schwelle)
+        self.peak = 0.0
+        # Zeitpunkte (time.monotonic) erkannter Bewegungen
+        self.detections = []
+
+    def update(self, patch, now):
+        """Wertet einen Ausschnitt aus. True, wenn damit eine Bewegung erkannt wurde."""
+        code = cv.COLOR_BGRA2GRAY if patch.ndim == 3 and patch.shape[2] == 4 else cv.COLOR_BGR2GRAY
+        gray = cv.GaussianBlur(cv.cvtColor(patch, code), (3, 3), 0)
+        prev, self._prev = self._prev, gray
+        if prev is None or prev.shape != gray.shape:
+            return False
+        level = cv.mean(cv.absdiff(gray, prev))[0]
+        if level == 0.0:
+            # Derselbe Frame noch einmal (Quelle langsamer als fps, z.B. PipeWire mit 15 FPS oder ein Replay):
+            # zählt weder als Ruhe für die Grundunruhe noch unterbricht er eine laufende Bestätigung
+            return False
+        self.frames += 1
+        if self._started is None:
+            self._started = now
+
+        if self.baseline is None or now - self._started < self.warmup:
+            self.baseline = level if self.baseline is None else max(self.baseline, level)
+            return False
+
+        threshold = max(self.min_diff, self.baseline * self.factor)
+        self.peak = max(self.peak, level / threshold)
+        if level > threshold:
+            self._over += 1
+            # Pro Ausschlag nur einmal melden
+            if self._over == self.confirm_frames:
+                self.detections.append(now)
+                self.moved.set()
+                return True
+            return False
+        self._over = 0
+        self.baseline += MOTION_BASELINE_ALPHA * (level - self.baseline)
+        return False
+
+    def watch(self, grab_patch, timeout, stop_event, done=None, stop_on_motion=True, clock=time.monotonic):
+        """
+        Holt mit bis zu fps Bildern pro Sekunde Ausschnitte über grab_patch() (None = keiner bekommen)
+        und wertet sie aus, bis eine Bewegung erkannt wurde (bei stop_on_motion), timeout abläuft,
+        stop_event oder done gesetzt wird. Gibt den Zeitpunkt der ersten Bewegung oder None zurück.
+        """
+        self.reset()
+        interval = 1.0 / self.fps
+        start = clock()
+        waiter = done if done is not None else stop_event
+        try:
+            while not stop_event.is_set() and not (done is not None and done.is_set()):
+                now = clock()
+                if timeout is not None and now - start >= timeout:
+                    break
+                patch = grab_patch()
+                if patch is not None and self.update(patch, clock()) and stop_on_motion:
+                    break
+                delay = now + interval - clock()
+                if delay > 0:
+                    waiter.wait(delay)
+        finally:
+            self.moved.set()
+        return self.detections[0] if self.detections else None
@@ -0,0 +1,356 @@
+import os
+import platform
+import shutil
+import subprocess
+import threading
+import cv2 as cv
+import numpy as np
+from .template_matcher import edge_map
+
+CAPTURE_BACKENDS = ("auto", "mss", "pipewire", "spectacle", "replay")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def is_wayland():
+    """Check if running on Wayland."""
+    if platform.system() != "Linux":
+        return False
+    return "WAYLAND_DISPLAY" in os.environ
+
+
+class CaptureBackend:
+    """
+    Schnittstelle aller Screenshot-Quellen.
+    grab() liefert ein BGRA- oder BGR-ndarray (oder None, wenn gerade kein Bild verfügbar ist).
+    grab_region(x, y, w, h) liefert nur einen Ausschnitt; Backends, die das günstiger können, überschreiben es.
+    """
+    name = "base"
+    # Pause zwischen zwei Frames im Modus "continuous"
+    frame_interval = 0.01
+    # False, sobald das Backend endgültig ausgefallen ist (dann greift der Fallback)
+    alive = True
+
+    def grab(self):
+        raise NotImplementedError
+
+    def grab_region(self, x, y, w, h):
+        frame = self.grab()
+        if frame is None:
+            return None
+        return frame[y:y + h, x:x + w]
+
+    def close(self):
+        pass
+
+
+class MssCapture(CaptureBackend):
+    """
+    Screenshots per MSS ohne Kopie: der BGRA-Puffer von MSS wird direkt als ndarray verwendet.
+    Die Umwandlung nach BGR passiert erst dort, wo das Bild tatsächlich gebraucht wird.
+    """
+    name = "mss"
+
+    def __init__(self, monitor_index=1):
+        import mss
+        self.sct = mss.mss()
+        self.monitor = self.sct.monitors[monitor_index]
+
+    def grab(self):
+        shot = self.sct.grab(self.monitor)
+        # shot.raw gehört zum Screenshot, frombuffer legt nur eine Sicht darauf an
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def grab_region(self, x, y, w, h):
+        # Nur das Rechteck vom Bildschirm holen: bei kleinen Ausschnitten ein Bruchteil eines Vollbilds
+        shot = self.sct.grab({"left": self.monitor["left"] + x, "top": self.monitor["top"] + y,
+                              "width": w, "height": h})
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        self.sct.close()
+
+
+class SpectacleCapture(CaptureBackend):
+    """Ein spectacle-Prozess pro Frame (langsam, aber funktioniert auf jedem KDE-Wayland)."""
+    name = "spectacle"
+    frame_interval = 0.1
+
+    def __init__(self, temp_file="/tmp/fishing_bot_capture.png"):
+        self.temp_file = temp_file
+
+    def grab(self):
+        try:
+            # -b: background (no GUI), -n: non-notifying, -o: output file
+            subprocess.run(["spectacle", "-b", "-n", "-o", self.temp_file], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if os.path.exists(self.temp_file):
+                return cv.imread(self.temp_file)
+        except Exception as e:
+            print(f"Spectacle capture error: {e}")
+        return None
+
+
+class PipeWireCapture(CaptureBackend):
+    """
+    Dauerhafte Capture-Session über einen PipeWire-Stream (z.B. vom ScreenCast-Portal).
+    Ein einzelner gst-launch-Prozess liefert rohe BGRx-Frames über stdout, ein Lese-Thread
+    schreibt sie abwechselnd in zwei vorab angelegte Puffer. grab() kopiert den letzten fertigen Frame.
+    """
+    name = "pipewire"
+    frame_interval = 0.05
+
+    def __init__(self, node, width, height, fps=15):
+        if shutil.which("gst-launch-1.0") is None:
+            raise RuntimeError("gst-launch-1.0 nicht gefunden")
+        self.width = width
+        self.height = height
+        self.frame_size = width * height * 4
+        self._buffers = [bytearray(self.frame_size), bytearray(self.frame_size)]
+        self._latest = None
+        self._lock = threading.Lock()
+
+        cmd = [
+            "gst-launch-1.0", "-q",
+            "pipewiresrc", f"path={node}", "do-timestamp=true", "!",
+            "videorate", "!", "videoconvert", "!", "videoscale", "!",
+            f"video/x-raw,format=BGRx,width={width},height={height},framerate={fps}/1", "!",
+            "fdsink", "fd=1", "sync=false",
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        self._reader = threading.Thread(target=self._read_loop, name="pipewire reader", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        index = 0
+        stream = self.process.stdout
+        while True:
+            view = memoryview(self._buffers[index])
+            filled = 0
+            while filled < self.frame_size:
+                n = stream.readinto(view[filled:])
+                if not n:
+                    print("PipeWire-Stream beendet.")
+                    self.alive = False
+                    return
+                filled += n
+            with self._lock:
+                self._latest = index
+            index = 1 - index
+
+    def grab(self):
+        with self._lock:
+            if self._latest is None:
+                return None
+            # Kopie, weil der Lese-Thread den Puffer gleich wieder überschreibt
+            return np.frombuffer(self._buffers[self._latest], dtype=np.uint8).reshape(
+                self.height, self.width, 4).copy()
+
+    def grab_region(self, x, y, w, h):
+        with self._lock:
+            if self._latest is None:
+                return None
+            # Nur den Ausschnitt kopieren, nicht den ganzen Frame
+            frame = np.frombuffer(self._buffers[self._latest], dtype=np.uint8).reshape(self.height, self.width, 4)
+            return frame[y:y + h, x:x + w].copy()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+
+
+class FileReplayCapture(CaptureBackend):
+    """
+    Fake-Backend: liefert nacheinander die Bilder eines Ordners oder die Frames eines Videos.
+    Mit clock (Funktion -> Sekunden) und fps wird stattdessen der Frame zur aktuellen Replay-Zeit geliefert.
+    """
+    name = "replay"
+    frame_interval = 0.03
+
+    def __init__(self, source, loop=True, clock=None, fps=None):
+        self.source = source
+        self.loop = loop
+        self.clock = clock
+        self.fps = fps
+        self.index = 0
+        self._video = None
+        self._files = []
+        self._last = (None, None)
+        if clock is not None and not fps:
+            raise ValueError("Zeitgesteuertes Replay braucht fps")
+        if os.path.isdir(source):
+            self._files = [os.path.join(source, f) for f in sorted(os.listdir(source))
+                           if f.lower().endswith(IMAGE_EXTENSIONS)]
+            if not self._files:
+                raise RuntimeError(f"Keine Bilder in {source}")
+            self.frame_count = len(self._files)
+        else:
+            self._video = cv.VideoCapture(source)
+            if not self._video.isOpened():
+                raise RuntimeError(f"Video {source} kann nicht geöffnet werden")
+            self.frame_count = int(self._video.get(cv.CAP_PROP_FRAME_COUNT))
+
+    def grab(self):
+        if self.clock is not None:
+            return self._grab_at(self.clock())
+
+        if self._video is not None:
+            ok, img = self._video.read()
+            if not ok and self.loop:
+                self._video.set(cv.CAP_PROP_POS_FRAMES, 0)
+                ok, img = self._video.read()
+            return img if ok else None
+
+        if self.index >= len(self._files):
+            if not self.loop:
+                return None
+            self.index = 0
+        img = cv.imread(self._files[self.index])
+        self.index += 1
+        return img
+
+    def _grab_at(self, seconds):
+        index = int(seconds * self.fps)
+        if index >= self.frame_count:
+            if not self.loop or self.frame_count <= 0:
+                return None
+            index %= self.frame_count
+        if self._last[0] == index:
+            return self._last[1]
+
+        if self._video is not None:
+            # Kurze Sprünge vorwärts lesen, sonst spulen
+            if not self.index <= index < self.index + 30:
+                self._video.set(cv.CAP_PROP_POS_FRAMES, index)
+                self.index = index
+            ok, img = True, None
+            while ok and self.index <= index:
+                ok, img = self._video.read()
+                self.index += 1
+            if not ok:
+                return None
+        else:
+            img = cv.imread(self._files[index])
+        self._last = (index, img)
+        return img
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+
+
+class FallbackCapture(CaptureBackend):
+    """Nutzt das primäre Backend und wechselt dauerhaft auf den Fallback, sobald es ausfällt."""
+
+    def __init__(self, primary, fallback_factory):
+        self.current = primary
+        self._fallback_factory = fallback_factory
+        self._switched = False
+
+    @property
+    def name(self):
+        return self.current.name
+
+    @property
+    def frame_interval(self):
+        return self.current.frame_interval
+
+    def _switch(self, reason):
+        print(f"Capture-Backend '{self.current.name}' ausgefallen ({reason}), wechsle auf Fallback.")
+        self.current.close()
+        self.current = self._fallback_factory()
+        self._switched = True
+
+    def _call(self, method, *args):
+        if not self._switched and not self.current.alive:
+            self._switch("Stream beendet")
+        try:
+            return getattr(self.current, method)(*args)
+        except Exception as e:
+            if self._switched:
+                raise
+            self._switch(e)
+            return getattr(self.current, method)(*args)
+
+    def grab(self):
+        return self._call("grab")
+
+    def grab_region(self, x, y, w, h):
+        return self._call("grab_region", x, y, w, h)
+
+    def close(self):
+        self.current.close()
+
+
+def _parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def create_capture_backend(opts=None):
+    """
+    Wählt das Capture-Backend anhand der Optionen:
+    capture_backend=auto|mss|pipewire|spectacle|replay, pipewire_node, capture_size=BREITExHÖHE,
+    replay_frames (Ordner oder Video für das Replay-Backend).
+    """
+    opts = opts or {}
+    backend = opts.get("capture_backend", "auto")
+    if backend not in CAPTURE_BACKENDS:
+        print(f"Unbekanntes Capture-Backend '{backend}', verwende 'auto'.")
+        backend = "auto"
+
+    if backend == "replay":
+        return FileReplayCapture(opts["replay_frames"])
+    if backend == "mss" or (backend == "auto" and not is_wayland()):
+        return MssCapture()
+    if backend == "spectacle":
+        return SpectacleCapture()
+
+    # Wayland: dauerhafter PipeWire-Stream, falls konfiguriert, sonst Spectacle
+    node = opts.get("pipewire_node")
+    size = opts.get("capture_size")
+    if node and size:
+        try:
+            width, height = _parse_size(size)
+            return FallbackCapture(PipeWireCapture(node, width, height), SpectacleCapture)
+        except Exception as e:
+            print(f"PipeWire-Capture nicht verfügbar: {e}")
+    elif backend == "pipewire":
+        print("PipeWire-Capture braucht 'pipewire_node' und 'capture_size' in options.txt.")
+    return SpectacleCapture()
+
+
+class FrameConverter:
+    """Wandelt BGRA-Frames (oder Ausschnitte davon) in einen wiederverwendeten BGR- bzw. Graustufen-Puffer um."""
+
+    def __init__(self):
+        self._out = None
+        self._gray = None
+
+    def to_bgr(self, frame):
+        if frame.ndim != 3 or frame.shape[2] != 4:
+            # Schon BGR (z.B. Spectacle/cv.imread)
+            return frame
+        shape = (frame.shape[0], frame.shape[1], 3)
+        if self._out is None or self._out.shape != shape:
+            self._out = np.empty(shape, dtype=np.uint8)
+        cv.cvtColor(frame, cv.COLOR_BGRA2BGR, dst=self._out)
+        return self._out
+
+    def to_gray(self, frame):
+        if frame.ndim == 2:
+            return frame
+        shape = frame.shape[:2]
+        if self._gray is None or self._gray.shape != shape:
+            self._gray = np.empty(shape, dtype=np.uint8)
+        # Direkt aus BGRA: kein BGR-Zwischenbild
+        code = cv.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv.COLOR_BGR2GRAY
+        cv.cvtColor(frame, code, dst=self._gray)
+        return self._gray
+
+    def to_features(self, frame, mode):
+        """Frame für den Merkmals-Modus (siehe template_matcher.FEATURE_MODES) aufbereiten."""
+        if mode == "gray":
+            return self.to_gray(frame)
+        if mode == "edges":
+            return edge_map(self.to_gray(frame))
+        return self.to_bgr(frame)
@@ -0,0 +1,161 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Würfe aller Sessions, nur angehängt (SQLite, eine Datei neben areas.json)
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))),
+                       "sessions.db")
+# Bei Änderungen am Schema erhöhen (und in _create migrieren)
+SCHEMA_VERSION = 1
+# Geschrieben wird, sobald so viele Einträge warten oder FLUSH_INTERVAL Sekunden vergangen sind
+BATCH_SIZE = 20
+FLUSH_INTERVAL = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended REAL,
+    area TEXT,
+    pattern TEXT,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS casts (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    time REAL NOT NULL,
+    area TEXT,
+    outcome TEXT NOT NULL,
+    confidence REAL,
+    lure_x INTEGER,
+    lure_y INTEGER,
+    cast_to_locate REAL,
+    locate_to_bite REAL,
+    bite_to_reel REAL,
+    sound_score REAL,
+    bite_source TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS casts_area_time ON casts(area, time);
+"""
+
+# Spalten der Tabelle casts, die direkt aus dem Wurf-Dict kommen; der Rest landet als JSON in data
+CAST_FIELDS = ("confidence", "cast_to_locate", "locate_to_bite", "bite_to_reel", "bite_source")
+
+
+def connect(path=None):
+    """Öffnet die Datenbank und legt die Tabellen bei Bedarf an."""
+    conn = sqlite3.connect(path or DB_PATH)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < SCHEMA_VERSION:
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    return conn
+
+
+def cast_outcome(cast):
+    """Ergebnis eines Wurfs: bite, timeout, rejected (schwacher Treffer) oder no_lure."""
+    if cast.get("detected"):
+        return "bite"
+    if cast.get("rejected"):
+        return "rejected"
+    if not cast.get("lure"):
+        return "no_lure"
+    return "timeout"
+
+
+class SessionStore:
+    """
+    Schreibt eine Session und ihre Würfe in SQLite. add_cast() stellt nur in eine Queue, ein eigener
+    Thread schreibt gesammelt in einer Transaktion; so kostet ein Wurf im Fishing-Thread keine Platten-I/O.
+    """
+
+    def __init__(self, path=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path or DB_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_id = None
+        self._queue = queue.Queue()
+        self._writer = None
+        self._started = threading.Event()
+
+    def begin(self, area, pattern, settings=None):
+        """Startet den Schreib-Thread und legt die Session an."""
+        if self._writer is not None:
+            return
+        self._writer = threading.Thread(target=self._run, args=(area, pattern, settings or {}),
+                                        name="session store", daemon=True)
+        self._writer.start()
+        self._started.wait(2.0)
+
+    def add_cast(self, cast, area):
+        if self._writer is None:
+            return
+        self._queue.put(("cast", time.time(), area, dict(cast)))
+
+    def close(self):
+        """Schreibt alles Ausstehende, setzt das Ende der Session und beendet den Thread."""
+        if self._writer is None:
+            return
+        self._queue.put(("end", time.time()))
+        self._writer.join(timeout=5.0)
+        self._writer = None
+
+    def _run(self, area, pattern, settings):
+        try:
+            conn = connect(self.path)
+            cur = conn.execute("INSERT INTO sessions (started, area, pattern, settings) VALUES (?, ?, ?, ?)",
+                               (time.time(), area, pattern, json.dumps(settings)))
+            conn.commit()
+            self.session_id = cur.lastrowid
+        except sqlite3.Error as e:
+            print(f"Session-Datenbank {self.path} nicht verfügbar: {e}")
+            self._started.set()
+            self._writer = None
+            return
+        self._started.set()
+
+        batch = []
+        ended = None
+        while ended is None:
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item[0] == "end":
+                    ended = item[1]
+                    break
+                batch.append(self._row(*item[1:]))
+            if batch:
+                self._write(conn, batch)
+                batch = []
+        try:
+            conn.execute("UPDATE sessions SET ended = ? WHERE id = ?", (ended, self.session_id))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Fehler beim Schließen der Session: {e}")
+        conn.close()
+
+    def _row(self, timestamp, area, cast):
+        lure = cast.pop("lure", None) or (None, None)
+        columns = [cast.pop(f, None) for f in CAST_FIELDS]
+        sound_score = cast.pop("peak_score", None)
+        outcome = cast_outcome({**cast, "lure": lure[0] is not None})
+        return (self.session_id, timestamp, area, outcome, columns[0], lure[0], lure[1], columns[1], columns[2],
+                columns[3], sound_score, columns[4], json.dumps(cast))
+
+    def _write(self, conn, rows):
+        try:
+            conn.executemany(
+                "INSERT INTO casts (session_id, time, area, outcome, confidence, lure_x, lure_y, cast_to_locate, "
+                "locate_to_bite, bite_to_reel, sound_score, bite_source, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Fehler beim Schreiben von {len(rows)} Würfen: {e}")
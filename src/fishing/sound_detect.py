@@ -1,12 +1,59 @@
-import sounddevice as sd
 import numpy as np
-import librosa
-from scipy import signal
 import os
 import time
+from . import audio_cache
+from .audio_stream import AudioEngine, open_input_stream
+from .metrics import Metrics, RAW_SCORE_BUCKETS, SCORE_BUCKETS
+from .sound_engines import CorrelationEngine, FingerprintEngine, SCORE_MODES
+
+SOUND_ENGINES = ("correlation", "fingerprint")
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "assets")
+# Ohne Konfiguration werden alle Audio-Dateien in assets mit diesem Präfix als Templates geladen
+SOUND_TEMPLATE_PATTERN = "Catchsound"
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".flac")
+
+# Schwellen (0..1), einmal pro Template kalibriert
+NORMALIZED_THRESHOLDS = {
+    'Catchsound.mp3': 0.45,
+}
+DEFAULT_NORMALIZED_THRESHOLD = 0.45
+FINGERPRINT_THRESHOLDS = {
+    'Catchsound.mp3': 0.5,
+}
+DEFAULT_FINGERPRINT_THRESHOLD = 0.5
+# Stille am Anfang/Ende des Templates abschneiden (dB unter der Spitze)
+TRIM_TOP_DB = 20
+
+def load_audio_template(path, sample_rate):
+    """Lädt eine Audio-Datei als Mono-Template, schneidet Stille ab und normiert auf Spitze 1."""
+    # librosa braucht allein Sekunden zum Import und wird nur hier gebraucht
+    import librosa
+    y, sr = librosa.load(path, sr=sample_rate, mono=True)
+    y, _ = librosa.effects.trim(y, top_db=TRIM_TOP_DB)
+    if np.max(np.abs(y)) > 0:
+        y = y / np.max(np.abs(y))
+    return y
+
+def load_cached_template(path, sample_rate):
+    """
+    Wie load_audio_template, aber über den Datei-Cache: nur beim ersten Mal (oder wenn sich die Datei
+    ändert) wird mit librosa dekodiert. Gibt (template als float32, Cache-Schlüssel) zurück.
+    """
+    key = audio_cache.template_key(path, sample_rate, TRIM_TOP_DB)
+    template = audio_cache.cached(key, lambda: load_audio_template(path, sample_rate).astype(np.float32))
+    return template, key
+
+def find_sound_templates(pattern=SOUND_TEMPLATE_PATTERN, assets_path=ASSETS_PATH):
+    """Dateinamen aller Audio-Templates in assets, die mit pattern beginnen (str oder Tuple)."""
+    if not os.path.isdir(assets_path):
+        return []
+    return sorted(f for f in os.listdir(assets_path)
+                  if f.startswith(pattern) and f.lower().endswith(AUDIO_EXTENSIONS))
 
 def get_audio_devices():
     """Gibt eine Liste von (index, name) Tupeln für Eingabegeräte zurück."""
+    import sounddevice as sd
     devices = sd.query_devices()
     input_devices = []
     for i, dev in enumerate(devices):
@@ -15,48 +62,108 @@ def get_audio_devices():
     return input_devices
 
 class SoundDetector:
-    def __init__(self, device_id=None):
+    def __init__(self, device_id=None, score_mode="normalized", engine="correlation", stream_factory=open_input_stream,
+                 metrics=None, templates=None):
         # --- KONFIGURATION ---
-        self.TEMPLATE_FILENAME = 'Catchsound.mp3'
+        # Mehrere Biss-Geräusche (Zonen, Clients, Sound-Einstellungen) werden gleichzeitig geprüft;
+        # templates: Dateinamen in assets (oder Pfade), sonst alle mit SOUND_TEMPLATE_PATTERN
+        self.TEMPLATE_FILENAMES = list(templates) if templates else find_sound_templates()
         self.SAMPLE_RATE = 48000 
+        # "raw": Korrelationsspitze (abhängig von Lautstärke), "normalized": 0..1
+        if score_mode not in SCORE_MODES:
+            print(f"Unbekannter Score-Modus '{score_mode}', verwende 'normalized'.")
+            score_mode = "normalized"
+        self.SCORE_MODE = score_mode
+        # "correlation": Korrelation bei voller Abtastrate, "fingerprint": dezimierter Bandenergie-Vergleich
+        if engine not in SOUND_ENGINES:
+            print(f"Unbekannte Sound-Engine '{engine}', verwende 'correlation'.")
+            engine = "correlation"
+        self.ENGINE = engine
         self.THRESHOLD = 60.0    
+        # Kleine Hops: ein Biss wird spätestens nach ~21 ms ausgewertet
+        self.HOP_SIZE = 1024
+        # Debug-Ausgabe des Scores höchstens so oft (Sekunden)
+        self.SCORE_PRINT_INTERVAL = 0.1
         self.DEBUG = True        
         
-        # Pfad relativ zur aktuellen Datei auflösen
-        base_path = os.path.dirname(os.path.realpath(__file__))
-        template_path = os.path.join(base_path, "assets", self.TEMPLATE_FILENAME)
-        
-        self.template = self.load_template(template_path)
+        # Pfade relativ zu assets auflösen; nicht ladbare Templates werden übersprungen
+        self.templates = []
+        self.template_names = []
+        self.template_keys = []
+        for filename in self.TEMPLATE_FILENAMES:
+            loaded = self.load_template(os.path.join(ASSETS_PATH, filename))
+            if loaded is not None:
+                template, key = loaded
+                self.templates.append(template)
+                self.template_names.append(os.path.basename(filename))
+                self.template_keys.append(key)
+        # Erstes Template (Kompatibilität mit Code, der nur eines kennt)
+        self.template = self.templates[0] if self.templates else None
         
         if device_id is not None:
             self.device_id = int(device_id)
             print(f"Verwende konfiguriertes Audio-Gerät ID: {self.device_id}")
-        else:
+        elif stream_factory is open_input_stream:
             self.device_id = self.find_loopback_device()
+        else:
+            # Eigene Audioquelle (z.B. WAV im Replay), kein Gerät nötig
+            self.device_id = None
         
-        if self.template is not None:
-            self.template_len = len(self.template)
-            print(f"SoundDetector initialisiert. Template Länge: {self.template_len}")
+        self.hop_size = self.HOP_SIZE
+        self.stream_factory = stream_factory
+        self.audio = None
+        self.engine = None
+        self._last_score_print = 0.0
+        self._score_peak = 0.0
+        # Höchster Score der letzten Wartephase (auch ohne Treffer)
+        self.last_peak_score = 0.0
+        # Zeitpunkt (time.time) des letzten Treffers, nicht erst der Rückkehr aus wait_for_sound
+        self.last_match_at = None
+        self.metrics = metrics if metrics is not None else Metrics()
+        if self.templates:
+            self.template_len = max(len(t) for t in self.templates)
+            self.engine = self.create_engine()
+            print(f"SoundDetector initialisiert ({self.ENGINE}). Templates: {', '.join(self.template_names)} "
+                  f"(max. Länge {self.template_len})")
         else:
             self.template_len = 0
 
+    def thresholds(self):
+        """Schwelle pro geladenem Template, passend zu Engine und Score-Modus."""
+        if self.ENGINE == "fingerprint":
+            return [FINGERPRINT_THRESHOLDS.get(n, DEFAULT_FINGERPRINT_THRESHOLD) for n in self.template_names]
+        if self.SCORE_MODE == "normalized":
+            return [NORMALIZED_THRESHOLDS.get(n, DEFAULT_NORMALIZED_THRESHOLD) for n in self.template_names]
+        return [self.THRESHOLD] * len(self.templates)
+
+    def create_engine(self):
+        """Baut die Erkennungs-Engine; Template-Spektren bzw. -Fingerabdrücke werden hier einmalig vorberechnet."""
+        if self.ENGINE == "fingerprint":
+            return FingerprintEngine(self.templates, self.SAMPLE_RATE, self.thresholds())
+        normalized = self.SCORE_MODE == "normalized"
+        spectra = []
+        for template, template_key in zip(self.templates, self.template_keys):
+            # Die Partitions-Spektren hängen nur von Template, Hop-Größe und Normierung ab
+            key = f"{template_key}-upols{self.hop_size}-{'norm' if normalized else 'raw'}"
+            spectra.append(audio_cache.cached(
+                key, lambda: CorrelationEngine.partition_spectra(template, self.hop_size, normalized)))
+        return CorrelationEngine(self.templates, self.hop_size, self.thresholds(), normalized=normalized,
+                                 spectra=spectra)
+
     def load_template(self, path):
+        """Lädt ein Template über den Cache. Gibt (template, cache_key) oder None zurück."""
         if not os.path.exists(path):
             print(f"Fehler: Datei {path} nicht gefunden.")
             return None
         print(f"Lade {path}...")
         try:
-            y, sr = librosa.load(path, sr=self.SAMPLE_RATE, mono=True)
-            y, _ = librosa.effects.trim(y, top_db=20)
+            return load_cached_template(path, self.SAMPLE_RATE)
         except Exception as e:
-            print(f"Fehler beim Laden der MP3: {e}")
+            print(f"Fehler beim Laden von {os.path.basename(path)}: {e}")
             return None
-            
-        if np.max(np.abs(y)) > 0:
-            y = y / np.max(np.abs(y))
-        return y
 
     def find_loopback_device(self):
+        import sounddevice as sd
         print("Suche nach Audio-Geräten...")
         devices = sd.query_devices()
         monitor_index = None
@@ -73,63 +180,73 @@ class SoundDetector:
             print("Kein spezifisches 'Monitor'-Gerät gefunden. Verwende Standard.")
             return None
 
-    def wait_for_sound(self, timeout=30.0, stop_callback=None):
+    def start_stream(self, stop_event=None):
+        """Öffnet den Audio-Stream für die ganze Session (einmalig, spätere Aufrufe sind No-Ops)."""
+        if self.audio is None:
+            self.audio = AudioEngine(self.engine, self.device_id, self.SAMPLE_RATE, self.hop_size,
+                                     stream_factory=self.stream_factory,
+                                     on_score=self._print_score if self.DEBUG else None)
+        self.audio.start(stop_event=stop_event)
+
+    def _print_score(self, score):
+        # Läuft im Erkennungs-Thread; höchstens alle SCORE_PRINT_INTERVAL Sekunden eine Ausgabe
+        self._score_peak = max(self._score_peak, score)
+        now = time.monotonic()
+        if now - self._last_score_print < self.SCORE_PRINT_INTERVAL:
+            return
+        self._last_score_print = now
+        if self._score_peak > self.engine.threshold / 6:
+            print(f"Score: {self._score_peak:.2f}")
+        self._score_peak = 0.0
+
+    def close(self):
+        if self.audio is not None:
+            self.audio.close()
+
+    def cancel_wait(self):
+        """Beendet ein laufendes wait_for_sound() ohne Treffer; der Stream bleibt offen."""
+        if self.audio is not None:
+            self.audio.cancel()
+
+    def wait_for_sound(self, timeout=30.0, stop_event=None, cancel_event=None):
         """
         Lauscht auf den Sound.
-        stop_callback: Eine Funktion, die True zurückgibt, wenn abgebrochen werden soll.
+        stop_event: threading.Event, das beim Stoppen gesetzt wird und das Warten sofort beendet.
+        cancel_event: wird gesetzt, bevor cancel_wait() aufgerufen wird; fängt ein Abbrechen vor arm() ab.
         """
-        if self.template is None or self.template_len == 0:
+        if not self.templates or self.template_len == 0:
             print("Kein Template geladen oder Länge 0.")
             return False
 
         print(f"Warte auf Sound (Timeout: {timeout}s)...")
-        
-        chunk_duration = 0.1 
-        chunk_size = int(chunk_duration * self.SAMPLE_RATE)
-        overlap_buffer = np.zeros(self.template_len)
-        
-        start_time = time.time()
 
         try:
-            with sd.InputStream(
-                device=self.device_id, 
-                channels=1, 
-                samplerate=self.SAMPLE_RATE, 
-                blocksize=chunk_size, 
-                dtype='float32'
-            ) as stream:
-                while True:
-                    # 1. Prüfen ob wir stoppen sollen (vom Bot aus)
-                    if stop_callback and stop_callback():
-                        print("Sound-Erkennung abgebrochen.")
-                        return False
-
-                    # 2. Timeout prüfen
-                    if timeout is not None and (time.time() - start_time) > timeout:
-                        return False
-
-                    data, overflow = stream.read(chunk_size)
-                    if overflow:
-                        pass
-                    
-                    new_audio = data[:, 0]
-                    
-                    combined = np.concatenate((overlap_buffer, new_audio))
-                    overlap_buffer = combined[-self.template_len:]
-                    
-                    if np.max(np.abs(combined)) < 0.01:
-                        continue
-
-                    corr = signal.correlate(combined, self.template, mode='valid', method='fft')
-                    peak = np.max(np.abs(corr)) if len(corr) > 0 else 0
-                    
-                    if self.DEBUG and peak > 10.0:
-                        print(f"Score: {peak:.2f}")
-
-                    if peak > self.THRESHOLD:
-                        print(f"\n>>> FISCH ERKANNT! (Score: {peak:.2f}) <<<\n")
-                        return True
-                        
+            # Stream bleibt zwischen den Würfen offen; stop_event beendet ihn am Ende der Session
+            self.start_stream(stop_event=stop_event)
+            matched = self.audio.arm()
+            if cancel_event is not None and cancel_event.is_set():
+                matched.set()
+
+            # Das Event wird vom Erkennungs-Thread im Moment des Treffers gesetzt,
+            # beim Stoppen weckt das Beenden des Streams den Wartenden ebenfalls
+            matched.wait(timeout)
+            self.last_peak_score = self.audio.take_peak_score()
+            bounds = SCORE_BUCKETS if self.engine.threshold <= 1.0 else RAW_SCORE_BUCKETS
+            self.metrics.observe("sound_peak_score", self.last_peak_score, bounds)
+            if self.audio.matched:
+                self.last_match_at = self.audio.matched_at
+                name = self.template_names[self.audio.matched_template]
+                self.metrics.inc(f"sound_template.{name}")
+                print(f"\n>>> FISCH ERKANNT! (Score: {self.last_peak_score:.2f}, {name}) <<<\n")
+                return True
+
+            self.audio.disarm()
+            if stop_event is not None and stop_event.is_set():
+                print("Sound-Erkennung abgebrochen.")
+            elif not self.audio.running:
+                print("Audio-Stream wurde beendet.")
+            return False
+
         except KeyboardInterrupt:
             print("\nAbbruch durch Benutzer.")
             return False
@@ -140,7 +257,7 @@ class SoundDetector:
 def main():
     # Standalone Test
     detector = SoundDetector()
-    if detector.template is None:
+    if not detector.templates:
         return
     
     print("Starte Endlos-Überwachung für Testzwecke...")
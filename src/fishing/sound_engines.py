@@ -0,0 +1,342 @@
+import numpy as np
+
+# Unterhalb dieser Amplitude gilt ein Block als Stille und wird nicht korreliert
+SILENCE_LEVEL = 0.01
+# Fensterenergie, unter der der normierte Score 0 ist (vermeidet Division durch ~0)
+MIN_WINDOW_ENERGY = 1e-6
+
+SCORE_MODES = ("normalized", "raw")
+
+
+def _as_template_list(templates):
+    """Ein einzelnes Template (1D-Array) oder eine Liste davon -> Liste von Arrays."""
+    if isinstance(templates, np.ndarray) and templates.ndim == 1:
+        return [templates]
+    return list(templates)
+
+
+def _score_scales(thresholds, count):
+    """
+    Pro Template eine eigene Schwelle, nach außen aber nur eine (die erste): die Scores werden so
+    skaliert, dass score_t > schwelle_t genau dann gilt, wenn skalierter Score > gemeinsame Schwelle.
+    """
+    if np.isscalar(thresholds):
+        thresholds = [thresholds] * count
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    if len(thresholds) != count:
+        raise ValueError("Anzahl der Schwellen passt nicht zur Anzahl der Templates")
+    return float(thresholds[0]), thresholds[0] / thresholds
+
+
+class RunningEnergy:
+    """Energie des length-Fensters, das an jedem Sample eines neuen Blocks endet (O(Blockgröße))."""
+
+    def __init__(self, length):
+        self.length = int(length)
+        # Ringpuffer der Quadrate der letzten length Samples
+        self._squares = np.zeros(self.length, dtype=np.float64)
+        self._pos = 0
+        self._energy = 0.0
+
+    def reset(self):
+        self._squares[:] = 0
+        self._pos = 0
+        self._energy = 0.0
+
+    def update(self, block):
+        M = self.length
+        q = np.square(block, dtype=np.float64)
+        n = len(q)
+        if n <= M:
+            idx = self._pos
+            end = idx + n
+            if end <= M:
+                leaving = self._squares[idx:end].copy()
+                self._squares[idx:end] = q
+            else:
+                split = M - idx
+                leaving = np.concatenate((self._squares[idx:], self._squares[:end - M]))
+                self._squares[idx:] = q[:split]
+                self._squares[:end - M] = q[split:]
+            self._pos = end % M
+        else:
+            # Block länger als das Template: was herausfällt, stammt großteils aus dem Block selbst
+            ordered = np.concatenate((self._squares[self._pos:], self._squares[:self._pos]))
+            leaving = np.concatenate((ordered, q[:n - M]))
+            self._squares[:] = q[n - M:]
+            self._pos = 0
+
+        energies = self._energy + np.cumsum(q - leaving)
+        self._energy = float(energies[-1])
+        return energies
+
+
+class CorrelationEngine:
+    """
+    Streaming-Kreuzkorrelation gegen ein oder mehrere Templates (uniformly partitioned overlap-save).
+
+    Jedes Template wird einmalig in Blöcke der Chunk-Größe zerlegt und deren Spektren vorberechnet.
+    Pro Chunk gibt es genau eine FFT der Länge 2*block_size, die sich alle Templates teilen; die
+    Vergangenheit steckt als Ringpuffer von Eingangsspektren in self._fdl. Die Spektren aller Templates
+    liegen gestapelt als (Frequenz, Template, Partition) (kürzere mit Null-Partitionen aufgefüllt), so
+    dass Multiplikation und Summe über die Partitionen für alle Templates ein einziges matmul sind. Die Ergebnisse entsprechen signal.correlate(history, template,
+    mode='valid') für jedes Fenster, das im neuen Chunk endet.
+
+    normalized=True: Score = |corr| / (|template| * |fenster|) in [0, 1], unabhängig von
+    Lautstärke und Geräte-Pegel. Die Fensterenergie wird pro Sample laufend fortgeschrieben.
+
+    threshold: eine Schwelle oder eine pro Template. process() liefert den besten (auf die erste
+    Schwelle skalierten) Score, welches Template ihn hatte, steht in best_template.
+    """
+
+    def __init__(self, templates, block_size, threshold, normalized=False, spectra=None):
+        # spectra: vorab berechnete partition_spectra(...) pro Template (z.B. aus dem Cache)
+        templates = _as_template_list(templates)
+        if not templates:
+            raise ValueError("Keine Templates")
+        self.block_size = int(block_size)
+        self.template_lens = [len(t) for t in templates]
+        self.template_len = max(self.template_lens)
+        self.threshold, self._scales = _score_scales(threshold, len(templates))
+        self.normalized = normalized
+
+        B = self.block_size
+        self.partitions = max(1, -(-self.template_len // B))
+        if spectra is None:
+            spectra = [self.partition_spectra(t, B, normalized) for t in templates]
+        elif isinstance(spectra, np.ndarray) and spectra.ndim == 2:
+            spectra = [spectra]
+        if len(spectra) != len(templates):
+            raise ValueError("Anzahl der Spektren passt nicht zur Anzahl der Templates")
+
+        P = self.partitions
+        self._spectra = np.zeros((B + 1, len(templates), P), dtype=np.complex128)
+        for i, (template_len, spec) in enumerate(zip(self.template_lens, spectra)):
+            if spec.shape != (max(1, -(-template_len // B)), B + 1):
+                raise ValueError(f"Spektren passen nicht zu Template/Blockgröße: {spec.shape}")
+            self._spectra[:, i, :len(spec)] = spec.T
+
+        # Jedes Eingangsspektrum steht doppelt im Ring (bei pos und pos + P): die letzten P Spektren
+        # sind dann immer der zusammenhängende Ausschnitt [pos, pos + P)
+        self._fdl = np.zeros((B + 1, 2 * P, 1), dtype=np.complex128)
+        self._input = np.zeros(2 * B, dtype=np.float64)
+        self._acc = np.zeros((B + 1, len(templates), 1), dtype=np.complex128)
+        self._pos = 0
+        self._samples_since_loud = self.template_len + B
+
+        # Laufende Fensterenergie, eine pro vorkommender Template-Länge
+        self._energies = {n: RunningEnergy(n) for n in set(self.template_lens)} if normalized else {}
+        self.last_scores = np.zeros(len(templates))
+        self.best_template = 0
+
+    @staticmethod
+    def partition_spectra(template, block_size, normalized=False):
+        """Spektren der Template-Blöcke (umgedreht, je auf 2*block_size aufgefüllt): partitions x (block_size+1)."""
+        template = np.asarray(template, dtype=np.float64)
+        if normalized:
+            norm = np.linalg.norm(template)
+            if norm > 0:
+                template = template / norm
+
+        B = int(block_size)
+        partitions = max(1, -(-len(template) // B))
+        # Korrelation = Faltung mit dem umgedrehten Template
+        reversed_template = np.zeros(partitions * B, dtype=np.float64)
+        reversed_template[:len(template)] = template[::-1]
+        parts = np.zeros((partitions, 2 * B), dtype=np.float64)
+        parts[:, :B] = reversed_template.reshape(partitions, B)
+        return np.fft.rfft(parts, axis=1)
+
+    def reset(self):
+        self._fdl[:] = 0
+        self._input[:] = 0
+        self._pos = 0
+        self._samples_since_loud = self.template_len + self.block_size
+        for energy in self._energies.values():
+            energy.reset()
+        self.last_scores[:] = 0
+
+    def _push(self, block):
+        B = self.block_size
+        # [vorheriger Block | neuer Block]
+        self._input[:B] = self._input[B:]
+        self._input[B:] = block
+        self._pos = (self._pos - 1) % self.partitions
+        spectrum = np.fft.rfft(self._input)
+        self._fdl[:, self._pos, 0] = spectrum
+        self._fdl[:, self._pos + self.partitions, 0] = spectrum
+
+    def _output(self):
+        B = self.block_size
+        pos = self._pos
+        # Pro Frequenz: Summe über p von H_t[p] * X[i-p], X[i-p] liegt bei pos + p
+        np.matmul(self._spectra, self._fdl[:, pos:pos + self.partitions], out=self._acc)
+        return np.fft.irfft(self._acc[:, :, 0].T, n=2 * B, axis=1)[:, B:]
+
+    def correlate(self, block):
+        """Schiebt einen Block (Länge block_size) nach und gibt die Korrelationswerte zurück (eine Zeile pro Template)."""
+        self._push(block)
+        return self._output()
+
+    def process(self, block):
+        """Gibt den Score (Korrelationsspitze, bzw. normierte Korrelation) für den neuen Block zurück."""
+        if np.max(np.abs(block)) >= SILENCE_LEVEL:
+            self._samples_since_loud = 0
+        else:
+            self._samples_since_loud += len(block)
+
+        self._push(block)
+        energies = {n: e.update(block) for n, e in self._energies.items()}
+        if self._samples_since_loud >= self.template_len + self.block_size:
+            # Das ganze Template-Fenster ist still: nur den Verlauf fortschreiben
+            self.last_scores[:] = 0
+            return 0.0
+
+        corr = np.abs(self._output())
+        if not self.normalized:
+            self.last_scores[:] = corr.max(axis=1)
+        else:
+            for i, template_len in enumerate(self.template_lens):
+                window = energies[template_len]
+                valid = window > MIN_WINDOW_ENERGY
+                if not np.any(valid):
+                    self.last_scores[i] = 0.0
+                    continue
+                # Rundungsfehler der laufenden Summe dürfen den Score nicht über 1 heben
+                self.last_scores[i] = min(1.0, np.max(corr[i][valid] / np.sqrt(window[valid])))
+
+        scaled = self.last_scores * self._scales
+        self.best_template = int(np.argmax(scaled))
+        return float(scaled[self.best_template])
+
+
+# --- Spektraler Fingerabdruck ---
+FP_DECIMATION = 4
+FP_FRAME = 256
+FP_HOP = 128
+FP_BANDS = 16
+FP_MIN_HZ = 100.0
+FP_MAX_HZ = 5500.0
+# Log-Bandenergie unterhalb dieses Werts gilt als Stille
+FP_SILENCE_LOG_ENERGY = np.log(1e-6)
+
+
+class FingerprintEngine:
+    """
+    Günstige Alternative zur Korrelation bei voller Abtastrate: das Audio wird um FP_DECIMATION
+    dezimiert, pro Frame werden FP_BANDS logarithmische Bandenergien berechnet und die letzten
+    Frames des Streams mit dem Fingerabdruck jedes Templates verglichen (Pearson-Korrelation, 0..1).
+    Pro Band wird der Mittelwert über das Fenster abgezogen: verglichen wird der zeitliche Verlauf,
+    nicht die spektrale Färbung (die hat Rauschen genauso) oder die Lautstärke.
+    Die Bandenergien des Streams werden einmal berechnet und von allen Templates geteilt.
+    Blöcke beliebiger Länge werden intern gepuffert. Schwellen wie bei CorrelationEngine.
+    """
+
+    def __init__(self, templates, sample_rate, threshold):
+        templates = _as_template_list(templates)
+        if not templates:
+            raise ValueError("Keine Templates")
+        self.threshold, self._scales = _score_scales(threshold, len(templates))
+        self.sample_rate = sample_rate
+        self.rate = sample_rate / FP_DECIMATION
+        self._window = np.hanning(FP_FRAME)
+
+        freqs = np.fft.rfftfreq(FP_FRAME, d=1.0 / self.rate)
+        edges = np.geomspace(FP_MIN_HZ, min(FP_MAX_HZ, self.rate / 2), FP_BANDS + 1)
+        # Bins außerhalb von [FP_MIN_HZ, FP_MAX_HZ] bekommen -1 bzw. FP_BANDS und werden ignoriert
+        self._band_of_bin = np.searchsorted(edges, freqs, side="right") - 1
+
+        self._template_fps = []
+        for template in templates:
+            fp = self.fingerprint(np.asarray(template, dtype=np.float64))
+            if len(fp) == 0:
+                raise ValueError("Template ist zu kurz für einen Fingerabdruck")
+            centered = fp - fp.mean(axis=0)
+            self._template_fps.append(centered / (np.linalg.norm(centered) or 1.0))
+        self.template_frames = max(len(fp) for fp in self._template_fps)
+
+        self._ring = np.zeros((self.template_frames, FP_BANDS), dtype=np.float64)
+        self.last_scores = np.zeros(len(templates))
+        self.best_template = 0
+        self.reset()
+
+    def reset(self):
+        self._ring[:] = FP_SILENCE_LOG_ENERGY
+        self._ring_pos = 0
+        self._frames_seen = 0
+        self._silent_frames = 0
+        self.last_scores[:] = 0
+        # Rest, der noch keinen vollen Dezimierungsschritt ergibt
+        self._pending = np.zeros(0, dtype=np.float64)
+        # Dezimiertes Signal, noch nicht zu Frames verarbeitet
+        self._decimated = np.zeros(0, dtype=np.float64)
+
+    def _decimate(self, samples):
+        # Mittelwert über FP_DECIMATION Samples = einfacher Tiefpass + Unterabtastung
+        usable = len(samples) - len(samples) % FP_DECIMATION
+        return samples[:usable].reshape(-1, FP_DECIMATION).mean(axis=1), samples[usable:]
+
+    def _band_energies(self, frames):
+        spectrum = np.abs(np.fft.rfft(frames * self._window, axis=-1)) ** 2
+        bands = np.zeros((len(frames), FP_BANDS), dtype=np.float64)
+        for b in range(FP_BANDS):
+            sel = self._band_of_bin == b
+            if np.any(sel):
+                bands[:, b] = spectrum[:, sel].sum(axis=1)
+        return np.log(bands + 1e-12)
+
+    def _frames(self, signal):
+        count = 1 + (len(signal) - FP_FRAME) // FP_HOP if len(signal) >= FP_FRAME else 0
+        if count == 0:
+            return np.zeros((0, FP_FRAME))
+        idx = np.arange(FP_FRAME)[None, :] + FP_HOP * np.arange(count)[:, None]
+        return signal[idx]
+
+    def fingerprint(self, audio):
+        """Fingerabdruck eines kompletten Signals (Frames x Bänder)."""
+        decimated, _ = self._decimate(audio)
+        return self._band_energies(self._frames(decimated))
+
+    def _match(self, window, template_fp):
+        # Template-Bänder sind mittelwertfrei, daher fallen die Bandmittel des Fensters beim
+        # Skalarprodukt weg und werden nur für die Norm gebraucht
+        F = len(template_fp)
+        dot = np.einsum('fb,fb->', window, template_fp)
+        band_means = window.mean(axis=0)
+        norm = np.sqrt(max(np.sum(np.square(window)) - F * np.sum(np.square(band_means)), 0.0))
+        return dot / norm if norm > 0 else 0.0
+
+    def process(self, block):
+        """Nimmt einen Audio-Block entgegen und gibt den besten Score der darin fertig gewordenen Frames zurück."""
+        samples = np.concatenate((self._pending, np.asarray(block, dtype=np.float64)))
+        decimated, self._pending = self._decimate(samples)
+        self._decimated = np.concatenate((self._decimated, decimated))
+
+        self.last_scores[:] = 0
+        frames = self._frames(self._decimated)
+        if len(frames) == 0:
+            return 0.0
+        self._decimated = self._decimated[len(frames) * FP_HOP:]
+
+        F = self.template_frames
+        for fp in self._band_energies(frames):
+            self._ring[self._ring_pos] = fp
+            self._ring_pos = (self._ring_pos + 1) % F
+            self._frames_seen += 1
+            self._silent_frames = 0 if fp.max() > FP_SILENCE_LOG_ENERGY else self._silent_frames + 1
+
+            # Ring in zeitlicher Reihenfolge (ältester Frame steht bei ring_pos); jedes Template
+            # vergleicht seine letzten len(template) Frames
+            ordered = None
+            for i, template_fp in enumerate(self._template_fps):
+                frames_needed = len(template_fp)
+                if self._frames_seen < frames_needed or self._silent_frames >= frames_needed:
+                    continue
+                if ordered is None:
+                    ordered = np.concatenate((self._ring[self._ring_pos:], self._ring[:self._ring_pos]))
+                score = self._match(ordered[F - frames_needed:], template_fp)
+                self.last_scores[i] = max(self.last_scores[i], min(1.0, max(0.0, score)))
+
+        scaled = self.last_scores * self._scales
+        self.best_template = int(np.argmax(scaled))
+        return float(scaled[self.best_template])
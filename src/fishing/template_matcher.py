@@ -0,0 +1,148 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2 as cv
+import numpy as np
+
+# Grobsuche auf verkleinertem Bild, danach Verfeinerung in voller Auflösung
+COARSE_SCALE = 0.25
+# Kleiner als das darf ein Template in der Grobstufe nicht werden, sonst ist der Treffer Zufall
+MIN_COARSE_SIZE = 10
+COARSE_CANDIDATES = 5
+# Zusätzlicher Rand (in Pixeln, volle Auflösung) um jeden Kandidaten bei der Verfeinerung
+REFINE_MARGIN = 8
+# Findet die Verfeinerung nichts Besseres, hat die Grobstufe vermutlich daneben gelegen
+# (kontrastarme Templates) -> Brute-Force über den ganzen Frame. Der FishingAgent schaltet das
+# pro Template ab und durchsucht nur, wenn kein Template des Gebiets min_confidence erreicht
+FALLBACK_CONFIDENCE = 0.7
+
+MATCH_ENGINES = ("pyramid", "brute")
+# Merkmale, auf denen gematcht wird: Farbe, Graustufen (1/3 der Daten) oder Kantenstärke (lichtunabhängiger)
+FEATURE_MODES = ("bgr", "gray", "edges")
+
+# matchTemplate gibt die GIL frei -> mehrere Templates parallel matchen
+MATCH_WORKERS = min(4, os.cpu_count() or 1)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Prozessweiter, begrenzter Worker-Pool für das Template-Matching."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MATCH_WORKERS, thread_name_prefix="match")
+        return _executor
+
+
+class FramePyramid:
+    """Ein Frame plus bei Bedarf erzeugte, gecachte verkleinerte Kopien."""
+
+    def __init__(self, img):
+        self.img = img
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def level(self, scale):
+        if scale >= 1.0:
+            return self.img
+        # Lock, damit parallel laufende Templates dieselbe Stufe nur einmal erzeugen
+        with self._lock:
+            lvl = self._levels.get(scale)
+            if lvl is None:
+                lvl = cv.resize(self.img, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA)
+                self._levels[scale] = lvl
+        return lvl
+
+
+def edge_map(gray):
+    """Kantenstärke (|dx| + |dy|)/2 eines Graustufenbilds als uint8; leicht geglättet gegen Rauschen."""
+    blurred = cv.GaussianBlur(gray, (3, 3), 0)
+    gx = cv.convertScaleAbs(cv.Sobel(blurred, cv.CV_16S, 1, 0, ksize=3))
+    gy = cv.convertScaleAbs(cv.Sobel(blurred, cv.CV_16S, 0, 1, ksize=3))
+    return cv.addWeighted(gx, 0.5, gy, 0.5, 0)
+
+
+def feature_image(img, mode):
+    """BGR- oder BGRA-Bild in das Merkmalsbild für mode umwandeln (bei "bgr" unverändert)."""
+    if mode == "bgr":
+        return img
+    if img.ndim == 3:
+        img = cv.cvtColor(img, cv.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv.COLOR_BGR2GRAY)
+    return img if mode == "gray" else edge_map(img)
+
+
+def coarse_scale_for(template, scale=COARSE_SCALE):
+    """Skalierung der Grobstufe, so dass das Template nicht unter MIN_COARSE_SIZE schrumpft."""
+    th, tw = template.shape[:2]
+    return max(scale, MIN_COARSE_SIZE / min(th, tw))
+
+
+def match_brute(img, template):
+    """Klassisches matchTemplate über das ganze Bild. Gibt (max_val, (x, y)) zurück."""
+    res = cv.matchTemplate(img, template, cv.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv.minMaxLoc(res)
+    return max_val, max_loc
+
+
+def _coarse_candidates(res, count, suppress_w, suppress_h):
+    """Die besten count lokalen Maxima aus einer matchTemplate-Ergebnismatrix (mit Non-Max-Suppression)."""
+    res = res.copy()
+    candidates = []
+    for _ in range(count):
+        _, max_val, _, max_loc = cv.minMaxLoc(res)
+        if not np.isfinite(max_val) or max_val <= -1:
+            break
+        candidates.append(max_loc)
+        x, y = max_loc
+        res[max(0, y - suppress_h):y + suppress_h + 1, max(0, x - suppress_w):x + suppress_w + 1] = -1
+    return candidates
+
+
+def match_pyramid(frame, template, scale=COARSE_SCALE, candidates=COARSE_CANDIDATES, margin=REFINE_MARGIN,
+                  coarse_template=None, fallback_confidence=FALLBACK_CONFIDENCE):
+    """
+    Zweistufige Suche: matchTemplate auf dem verkleinerten Frame, dann nur kleine Fenster
+    um die besten Kandidaten in voller Auflösung. Gibt (max_val, (x, y)) wie match_brute zurück.
+    frame: FramePyramid oder ndarray. fallback_confidence=None schaltet den Brute-Force-Fallback ab.
+    """
+    if not isinstance(frame, FramePyramid):
+        frame = FramePyramid(frame)
+    img = frame.img
+
+    scale = coarse_scale_for(template, scale)
+    if scale >= 1.0:
+        return match_brute(img, template)
+
+    small = frame.level(scale)
+    if coarse_template is None:
+        coarse_template = cv.resize(template, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA)
+    sth, stw = coarse_template.shape[:2]
+    if small.shape[0] < sth or small.shape[1] < stw:
+        return match_brute(img, template)
+
+    res = cv.matchTemplate(small, coarse_template, cv.TM_CCOEFF_NORMED)
+    coarse = _coarse_candidates(res, candidates, max(1, stw // 2), max(1, sth // 2))
+
+    th, tw = template.shape[:2]
+    img_h, img_w = img.shape[:2]
+    # Rundungsfehler der Grobstufe: eine Grobzelle entspricht 1/scale Pixeln
+    pad = margin + int(np.ceil(1.0 / scale))
+
+    best_max_val = -1
+    best_loc = None
+    for cx, cy in coarse:
+        x0 = max(0, int(cx / scale) - pad)
+        y0 = max(0, int(cy / scale) - pad)
+        x1 = min(img_w, int(cx / scale) + tw + pad)
+        y1 = min(img_h, int(cy / scale) + th + pad)
+        if x1 - x0 < tw or y1 - y0 < th:
+            continue
+        max_val, max_loc = match_brute(img[y0:y1, x0:x1], template)
+        if max_val > best_max_val:
+            best_max_val = max_val
+            best_loc = (max_loc[0] + x0, max_loc[1] + y0)
+
+    if best_loc is None or (fallback_confidence is not None and best_max_val < fallback_confidence):
+        return match_brute(img, template)
+    return best_max_val, best_loc
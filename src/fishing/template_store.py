@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import cv2 as cv
+from .template_matcher import coarse_scale_for, feature_image
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "assets")
+# Gefundene Template-Skalierung pro Gebiet und Bildschirmauflösung (maschinenspezifisch, neben areas.json)
+SCALES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))),
+                           "scales.json")
+# Kleiner darf ein skaliertes Template nicht werden, sonst passt es überall ein bisschen
+MIN_SCALED_SIZE = 8
+
+
+class Template:
+    """Ein dekodiertes Köder-Template mit allen vorberechneten Varianten."""
+
+    def __init__(self, name, path, mtime, image, scale=1.0):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        # Faktor gegenüber der PNG-Datei (UI-Skalierung, Auflösung, Kamera-Zoom)
+        self.scale = scale
+        self.bgr = image
+        self.gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+        self.shape = image.shape
+
+        # Grobstufe für match_pyramid
+        self.coarse_scale = coarse_scale_for(image)
+        self.levels = {1.0: image}
+        if self.coarse_scale < 1.0:
+            self.levels[self.coarse_scale] = cv.resize(
+                image, None, fx=self.coarse_scale, fy=self.coarse_scale, interpolation=cv.INTER_AREA)
+
+        self._scaled = {}
+        self._scaled_lock = threading.Lock()
+        # Merkmals-Modus -> (Bild, Grobstufe); "bgr" ist schon vorhanden
+        self._features = {"bgr": (image, self.coarse)}
+
+    @property
+    def coarse(self):
+        return self.levels.get(self.coarse_scale)
+
+    def features(self, mode):
+        """(Bild, Grobstufe oder None) im Merkmals-Modus mode, einmal erzeugt und gecacht."""
+        entry = self._features.get(mode)
+        if entry is None:
+            # "bgr" liegt schon vor; Graustufen und Kanten gehen vom vorberechneten Graubild aus
+            image = feature_image(self.gray, mode)
+            coarse = None
+            if self.coarse_scale < 1.0:
+                coarse = cv.resize(image, None, fx=self.coarse_scale, fy=self.coarse_scale,
+                                   interpolation=cv.INTER_AREA)
+            # Gleichzeitiges Erzeugen in zwei Threads liefert dasselbe Ergebnis, ein Lock ist unnötig
+            entry = self._features[mode] = (image, coarse)
+        return entry
+
+    def scaled(self, scale):
+        """Dasselbe Template in anderer Größe, einmal erzeugt und gecacht. None, wenn es zu klein würde."""
+        if scale == 1.0:
+            return self
+        with self._scaled_lock:
+            if scale not in self._scaled:
+                interpolation = cv.INTER_AREA if scale < 1.0 else cv.INTER_LINEAR
+                image = cv.resize(self.bgr, None, fx=scale, fy=scale, interpolation=interpolation)
+                variant = None
+                if min(image.shape[:2]) >= MIN_SCALED_SIZE:
+                    variant = Template(self.name, self.path, self.mtime, image, scale)
+                self._scaled[scale] = variant
+            return self._scaled[scale]
+
+
+# Prozessweiter Cache: Pfad -> (mtime, Template oder None), bei geänderter mtime wird neu geladen
+_templates = {}
+# Verzeichnisinhalt, nur neu gelesen wenn sich die mtime des Ordners ändert
+_listing = (None, [])
+_lock = threading.Lock()
+
+
+def _load(path, mtime):
+    img = cv.imread(path)
+    if img is None:
+        return None
+    if not cv.meanStdDev(img)[1].any():
+        # Einfarbiges Template: TM_CCOEFF_NORMED ist hier überall undefiniert
+        print(f"Warning: Template {os.path.basename(path)} hat keinen Kontrast, wird ignoriert.")
+        return None
+    template = Template(os.path.basename(path)[:-4], path, mtime, img)
+    print(f"Loaded template: {os.path.basename(path)}")
+    return template
+
+
+def _list_pngs(assets_path):
+    global _listing
+    dir_mtime = os.stat(assets_path).st_mtime_ns
+    key = (assets_path, dir_mtime)
+    if _listing[0] != key:
+        _listing = (key, sorted(f for f in os.listdir(assets_path) if f.endswith(".png")))
+    return _listing[1]
+
+
+def get_templates(target_pattern, assets_path=ASSETS_PATH):
+    """
+    Liefert alle Templates, deren Dateiname mit target_pattern beginnt (str oder Tuple).
+    Dekodiert wird nur beim ersten Zugriff oder wenn sich die Datei geändert hat.
+    """
+    if not os.path.exists(assets_path):
+        return []
+
+    result = []
+    with _lock:
+        for f in _list_pngs(assets_path):
+            if not f.startswith(target_pattern):
+                continue
+            path = os.path.join(assets_path, f)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+
+            entry = _templates.get(path)
+            if entry is None or entry[0] != mtime:
+                entry = (mtime, _load(path, mtime))
+                _templates[path] = entry
+            if entry[1] is not None:
+                result.append(entry[1])
+    return result
+
+
+def preload(patterns, assets_path=ASSETS_PATH):
+    """Dekodiert die Templates aller übergebenen Muster vorab (z.B. im Hintergrund beim Start)."""
+    for pattern in patterns:
+        try:
+            get_templates(pattern, assets_path)
+        except Exception as e:
+            print(f"Fehler beim Vorladen der Templates für '{pattern}': {e}")
+
+
+_scales = None
+_scales_lock = threading.Lock()
+
+
+def pattern_name(target_pattern):
+    """Gebiets-Muster (str oder Tuple) als Schlüssel für gespeicherte Werte pro Gebiet."""
+    return "+".join(target_pattern) if isinstance(target_pattern, (tuple, list)) else target_pattern
+
+
+def scale_key(target_pattern, frame_shape):
+    """Schlüssel für die Skalierung: Gebiet (Muster) und Bildschirmauflösung."""
+    return f"{pattern_name(target_pattern)}@{frame_shape[1]}x{frame_shape[0]}"
+
+
+def _load_scales(path):
+    global _scales
+    if _scales is None:
+        _scales = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _scales = {k: float(v) for k, v in json.load(f).items()}
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"Fehler beim Laden von {path}: {e}")
+    return _scales
+
+
+def get_scale(key, path=None):
+    """Gespeicherte Skalierung zu key oder None."""
+    with _scales_lock:
+        return _load_scales(path or SCALES_PATH).get(key)
+
+
+def set_scale(key, scale, path=None):
+    """Merkt sich die Skalierung zu key und schreibt die Datei (nur bei Änderung)."""
+    path = path or SCALES_PATH
+    with _scales_lock:
+        scales = _load_scales(path)
+        if scales.get(key) == scale:
+            return
+        scales[key] = scale
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(scales, f, indent=4, sort_keys=True)
+        except OSError as e:
+            print(f"Fehler beim Speichern von {path}: {e}")
+
+
+def clear():
+    global _listing
+    with _lock:
+        _templates.clear()
+        _listing = (None, [])
@@ -0,0 +1,109 @@
+import json
+import os
+import numpy as np
+
+# Gelernte Zeiten pro Gebiet (maschinen- und spielerabhängig, neben areas.json)
+TIMINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))),
+                            "timings.json")
+# Erst ab so vielen Beobachtungen werden die gelernten Zeiten verwendet, vorher die Konstanten
+MIN_SAMPLES = 10
+# Nur die letzten Beobachtungen zählen (Gebiet, Rechner oder Spiel können sich ändern)
+MAX_SAMPLES = 200
+# Nach dem Auswerfen wird ab diesem Perzentil der Sichtbarkeitszeit minus SETTLE_MARGIN gesucht
+VISIBLE_PERCENTILE = 10
+SETTLE_MARGIN = 0.25
+MIN_SETTLE = 0.5
+# Auf den Biss wird bis zu diesem Perzentil der Zeit Wurf -> Biss plus BITE_MARGIN gewartet
+BITE_PERCENTILE = 95
+BITE_MARGIN = 2.0
+MIN_WATCH = 2.0
+# Nach so vielen neuen Beobachtungen wird die Datei geschrieben (und am Ende der Session)
+SAVE_EVERY = 5
+
+
+class AdaptiveTimings:
+    """
+    Beobachtete Zeiten eines Gebiets, jeweils in Sekunden ab dem Auswerfen: bis der Köder sichtbar ist
+    und bis zum Biss. Daraus werden die Wartezeiten für CAST und WATCH abgeleitet.
+    Ohne path bleiben die Werte nur im Speicher (z.B. im Replay).
+    """
+
+    def __init__(self, key, path=TIMINGS_PATH):
+        self.key = key
+        self.path = path
+        self.visible = []
+        self.bite = []
+        self._unsaved = 0
+        if path:
+            self._load()
+
+    def _read_file(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            print(f"Fehler beim Laden von {self.path}: {e}")
+            return {}
+
+    def _load(self):
+        entry = self._read_file().get(self.key, {})
+        self.visible = [float(v) for v in entry.get("visible", [])][-MAX_SAMPLES:]
+        self.bite = [float(v) for v in entry.get("bite", [])][-MAX_SAMPLES:]
+
+    def save(self):
+        if not self.path or not self._unsaved:
+            return
+        data = self._read_file()
+        data[self.key] = {"visible": [round(v, 3) for v in self.visible], "bite": [round(v, 3) for v in self.bite]}
+        try:
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._unsaved = 0
+        except OSError as e:
+            print(f"Fehler beim Speichern von {self.path}: {e}")
+
+    def _add(self, samples, value):
+        samples.append(float(value))
+        del samples[:-MAX_SAMPLES]
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY:
+            self.save()
+
+    def settle_time(self, default):
+        """Wartezeit nach dem Auswerfen bis zur ersten Suche nach dem Köder (höchstens default)."""
+        if len(self.visible) < MIN_SAMPLES:
+            return default
+        learned = np.percentile(self.visible, VISIBLE_PERCENTILE) - SETTLE_MARGIN
+        return float(min(default, max(MIN_SETTLE, learned)))
+
+    def bite_deadline(self):
+        """Spätester erwarteter Biss in Sekunden ab dem Auswerfen, None solange zu wenig beobachtet wurde."""
+        if len(self.bite) < MIN_SAMPLES:
+            return None
+        return float(np.percentile(self.bite, BITE_PERCENTILE)) + BITE_MARGIN
+
+    def watch_timeout(self, since_cast, default):
+        """Timeout für WATCH, wenn seit dem Auswerfen since_cast Sekunden vergangen sind (höchstens default)."""
+        deadline = self.bite_deadline()
+        if deadline is None:
+            return default
+        return min(default, max(MIN_WATCH, deadline - since_cast))
+
+    def record_visible(self, seconds):
+        # Beim ersten Blick schon sichtbar: nur eine obere Grenze, drückt die Wartezeit aber weiter nach unten
+        self._add(self.visible, seconds)
+
+    def record_bite(self, seconds):
+        self._add(self.bite, seconds)
+
+    def record_timeout(self, seconds):
+        """
+        WATCH lief mit gelernter Frist ab: der Biss kam (wenn überhaupt) später. Ohne diese Werte
+        würde die Verteilung mit jeder abgeschnittenen Frist weiter schrumpfen.
+        """
+        self._add(self.bite, seconds + BITE_MARGIN)
@@ -1,35 +1,33 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import time
 import os
 import sys
-import cv2 as cv
-import numpy as np
-import mss
-import platform
-import subprocess
 
 # Pfade setzen, damit wir Module aus src importieren können
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from main import AREAS, load_options, save_options, MainAgent, save_areas
-from fishing import fishing_agent, sound_detect
+# Nur leichte Imports: das Fenster soll sofort erscheinen. fishing_agent (cv2, numpy, librosa),
+# sound_detect und screen_capture werden erst bei Bedarf bzw. im Hintergrund importiert.
+from main import AREAS, load_options, save_options, MainAgent, save_areas, preload_area_templates, update_screen
+
+METRICS_REFRESH_MS = 1000
 
 class FishingBotGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Fishing Bot GUI")
-        self.root.geometry("400x320") # Fenster etwas vergrößern
+        self.root.geometry("400x380") # Fenster etwas vergrößern (Platz für Metriken)
         self.root.resizable(False, False)
 
         self.running = False
         self.main_agent = None
+        self.agent = None
         self.screen_thread = None
         
         # Optionen laden
         self.options = load_options()
-        
+
         # --- UI Elemente ---
         
         # 1. Gebiet Auswahl
@@ -74,7 +72,8 @@ class FishingBotGUI:
         self.audio_combo.pack(pady=5, fill='x', padx=20)
         
         self.audio_devices = [] # Liste von (id, name)
-        self.refresh_audio_devices()
+        self.audio_combo['values'] = ["Auto (Standard)"]
+        self.audio_combo.current(0)
         
         # 3. Cast Button Auswahl (NEU)
         lbl_cast = ttk.Label(root, text="Angel-Taste:")
@@ -108,12 +107,25 @@ class FishingBotGUI:
         self.lbl_status = ttk.Label(root, text="Bereit", foreground="gray")
         self.lbl_status.pack(side="bottom", pady=5)
 
+        # Telemetrie der laufenden Session (wird jede Sekunde aktualisiert)
+        self.lbl_metrics = ttk.Label(root, text="", foreground="gray", justify="center", font=("Arial", 8))
+        self.lbl_metrics.pack(side="bottom")
+
         # Beim Schließen aufräumen
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Erst wenn das Fenster steht: Audio-Geräte abfragen und Templates im Hintergrund dekodieren,
+        # damit START sofort loslegt
+        self.root.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        self.refresh_audio_devices()
+        preload_area_templates()
+
     def refresh_audio_devices(self):
         """Lädt Audio-Geräte und setzt die Auswahl basierend auf options.txt"""
         try:
+            from fishing import sound_detect
             raw_devices = sound_detect.get_audio_devices()
             self.audio_devices = raw_devices
             
@@ -251,6 +263,7 @@ class FishingBotGUI:
             # Speichern
             AREAS[new_id] = {"name": name, "pattern": pattern}
             save_areas(AREAS)
+            preload_area_templates()
             
             # GUI aktualisieren
             self.refresh_area_list()
@@ -285,12 +298,11 @@ class FishingBotGUI:
         # Parameter setzen
         selected_name = self.area_combo.get()
         area_id = self.area_name_to_id.get(selected_name, "1")
-        self.main_agent.selected_area_pattern = AREAS[area_id]["pattern"]
-        self.main_agent.selected_area_name = AREAS[area_id]["name"]
+        self.main_agent.select_area(area_id)
         self.main_agent.audio_device_id = self.get_selected_audio_id()
         self.main_agent.cast_button = self.cast_combo.get()
         
-        # Screen Thread starten (angepasste Version mit Stop-Flag)
+        # Screen Thread starten (endet über stop_event, wenn running auf False gesetzt wird)
         self.screen_thread = threading.Thread(
             target=self.update_screen_loop, 
             args=(), 
@@ -300,25 +312,46 @@ class FishingBotGUI:
         
         # Warten bis erstes Bild da ist, dann Fishing Agent starten
         threading.Thread(target=self.wait_for_image_and_start_agent, daemon=True).start()
+        self.refresh_metrics()
+
+    def refresh_metrics(self):
+        if self.main_agent is not None:
+            self.lbl_metrics.config(text=self.main_agent.metrics.format_status())
+        if self.running:
+            self.root.after(METRICS_REFRESH_MS, self.refresh_metrics)
 
     def wait_for_image_and_start_agent(self):
         self.lbl_status.config(text="Warte auf Screenshot...", foreground="orange")
-        while self.running and self.main_agent.cur_img is None:
-            time.sleep(0.1)
+        main_agent = self.main_agent
+        while main_agent.running and main_agent.request_frame() is None:
+            print("Noch kein Screenshot, versuche erneut...")
             
-        if not self.running:
+        if not main_agent.running:
             return
 
         self.lbl_status.config(text=f"Fische in: {self.main_agent.selected_area_name}", foreground="green")
         
-        # Fishing Agent starten
+        # Fishing Agent starten (der Import der schweren Module passiert hier, im Hintergrund-Thread)
         try:
+            from fishing import fishing_agent
             agent = fishing_agent.FishingAgent(
                 self.main_agent, 
                 target_pattern=self.main_agent.selected_area_pattern,
                 audio_device_id=self.main_agent.audio_device_id,
-                cast_button=self.main_agent.cast_button
+                cast_button=self.main_agent.cast_button,
+                search_region=self.main_agent.selected_area_region,
+                min_confidence=self.main_agent.selected_area_min_confidence,
+                accept_confidence=self.main_agent.selected_area_accept_confidence,
+                match_engine=self.main_agent.match_engine,
+                sound_score=self.main_agent.sound_score,
+                sound_engine=self.main_agent.sound_engine,
+                sound_templates=self.main_agent.sound_templates,
+                bite_signal=self.main_agent.bite_signal,
+                match_scales=self.main_agent.match_scales,
+                match_features=self.main_agent.match_features,
+                session_db=self.main_agent.session_db
             )
+            self.agent = agent
             agent.run()
         except Exception as e:
             print(f"Fehler beim Starten des Agents: {e}")
@@ -340,66 +373,17 @@ class FishingBotGUI:
         self.btn_action.config(text="START")
         self.lbl_status.config(text="Gestoppt", foreground="black")
 
-    def is_wayland(self):
-        """Check if running on Wayland."""
-        if platform.system() != "Linux":
-            return False
-        return "WAYLAND_DISPLAY" in os.environ
-
-    def capture_screen_wayland(self):
-        """Capture screen using spectacle on Wayland."""
-        try:
-            temp_file = "/tmp/fishing_bot_capture_gui.png"
-            # -b: background, -n: non-notifying, -o: output
-            subprocess.run(["spectacle", "-b", "-n", "-o", temp_file], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            if os.path.exists(temp_file):
-                img = cv.imread(temp_file)
-                return img
-        except Exception as e:
-            print(f"Spectacle capture error: {e}")
-        return None
-
     def update_screen_loop(self):
-        """
-        Lokale Implementierung von update_screen mit MSS (Cross-Platform) oder Spectacle (Wayland).
-        """
-        use_wayland = self.is_wayland()
-        
-        if use_wayland:
-            print("GUI Screen Update Thread gestartet (Spectacle/Wayland).")
-            sct = None
-        else:
-            print("GUI Screen Update Thread gestartet (MSS).")
-            sct = mss.mss()
-            monitor = sct.monitors[1] # Hauptmonitor
-
-        while self.running:
-            try:
-                img = None
-                if use_wayland:
-                    img = self.capture_screen_wayland()
-                else:
-                    # Screenshot machen
-                    sct_img = sct.grab(monitor)
-                    img = np.array(sct_img)
-                    img = cv.cvtColor(img, cv.COLOR_BGRA2BGR)
-                
-                if img is not None and self.main_agent:
-                    self.main_agent.cur_img = img
-                
-                # Kurze Pause um CPU zu schonen
-                # Bei Wayland/Spectacle etwas länger warten
-                time.sleep(0.1 if use_wayland else 0.05)
-            except Exception as e:
-                print(f"Screenshot Fehler: {e}")
-                time.sleep(1)
-        
-        print("GUI Screen Update Thread beendet.")
+        """Capture-Schleife aus main.update_screen, mit dem Backend laut den Optionen der GUI."""
+        from fishing.screen_capture import create_capture_backend
+        update_screen(self.main_agent, create_capture_backend(self.options))
 
     def on_close(self):
         self.stop_fishing()
         self.save_current_settings() # Save on exit
+        # Fishing-Thread zu Ende laufen lassen, sonst fehlen die letzten Würfe in der Session-Datenbank
+        if self.agent is not None:
+            self.agent.stop()
         self.root.destroy()
 
 if __name__ == "__main__":
@@ -1,16 +1,14 @@
 import os
-from threading import Thread
-import cv2 as cv    
+from threading import Thread, Event, Condition
 import time
-import numpy as np
-import mss
-import subprocess
-import platform
 import json
-import fishing.fishing_agent as fishing_agent
-import fishing.sound_detect as sound_detect
+# Nur leichte Module beim Start; cv2, numpy, librosa & Co. kommen erst mit dem Bot
+from fishing.metrics import Metrics, FPS_BUCKETS
 
 FPS_REPORT_DELAY = 3
+# "on_demand": Screenshot nur wenn der FishingAgent einen anfordert, "continuous": Dauerschleife
+CAPTURE_MODES = ("on_demand", "continuous")
+FRAME_REQUEST_TIMEOUT = 5.0
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 OPTIONS_PATH = os.path.join(_PROJECT_ROOT, "options.txt")
 AREAS_PATH = os.path.join(_PROJECT_ROOT, "areas.json")
@@ -77,28 +75,76 @@ class MainAgent:
         self.cur_img = None
         self.audio_device_id = None
         self.cast_button = "middle" # Default
+        self.match_engine = "pyramid"
+        # Matching auf "bgr", "gray" oder "edges"
+        self.match_features = "bgr"
+        self.capture_mode = "on_demand"
+        self.sound_score = "normalized"
+        self.sound_engine = "correlation"
+        # Dateinamen der Biss-Geräusche in assets; None = alle "Catchsound*"
+        self.sound_templates = None
+        # Biss-Signal: "audio", "motion" (Bewegung am Köder), "either" (was zuerst kommt), "confirm" (beides)
+        self.bite_signal = "audio"
+        # Template-Skalierungen für die Köder-Suche: None = nur Originalgröße, "auto" oder Liste von Faktoren
+        self.match_scales = None
         
-        # Zentrales Flag zur Steuerung
+        # Frame-Anforderung (Agent -> Capture-Thread) und Antwort (Capture-Thread -> Agent)
+        self._frame_request = Event()
+        self.frame_ready = Condition()
+        self._frame_seq = 0
+        self._last_publish = None
+        # Ausschnitt-Anforderungen (x, y, w, h), z.B. für die Bewegungserkennung am Köder
+        self.cur_patch = None
+        self._frame_region = None
+        self._patch_seq = 0
+
+        # Zentrales Stop-Signal: alle Wartestellen blockieren darauf statt zu pollen
+        self.stop_event = Event()
         self.running = False
 
         # Standardwerte initialisieren (Fallback)
+        self.selected_area_id = None
         self.selected_area_pattern = ""
         self.selected_area_name = "Unknown"
+        self.selected_area_region = None
+        # Konfidenz-Schwellen des Gebiets aus areas.json (None = Standard des FishingAgent)
+        self.selected_area_min_confidence = None
+        self.selected_area_accept_confidence = None
 
         # Versuche das erste verfügbare Gebiet zu nehmen, falls vorhanden
         if AREAS:
-            first_key = next(iter(AREAS))
-            self.selected_area_pattern = AREAS[first_key]["pattern"]
-            self.selected_area_name = AREAS[first_key]["name"]
+            self.select_area(next(iter(AREAS)))
 
         # Gespeicherte Optionen laden
         opts = load_options()
         saved_area = opts.get("selected_area")
         if saved_area and saved_area in AREAS:
-            self.selected_area_pattern = AREAS[saved_area]["pattern"]
-            self.selected_area_name = AREAS[saved_area]["name"]
+            self.select_area(saved_area)
             
         self.cast_button = opts.get("cast_button", "middle")
+        self.match_engine = opts.get("match_engine", self.match_engine)
+        self.match_features = opts.get("match_features", self.match_features)
+        self.sound_score = opts.get("sound_score", self.sound_score)
+        self.sound_engine = opts.get("sound_engine", self.sound_engine)
+        sound_templates = [t.strip() for t in opts.get("sound_templates", "").split(",") if t.strip()]
+        self.sound_templates = sound_templates or None
+        self.bite_signal = opts.get("bite_signal", self.bite_signal)
+        match_scales = opts.get("match_scales", "").strip()
+        if match_scales == "auto":
+            self.match_scales = match_scales
+        elif match_scales:
+            try:
+                self.match_scales = [float(s) for s in match_scales.split(",") if s.strip()]
+            except ValueError:
+                print(f"Ungültige match_scales '{match_scales}', verwende Originalgröße.")
+        capture_mode = opts.get("capture_mode", self.capture_mode)
+        if capture_mode in CAPTURE_MODES:
+            self.capture_mode = capture_mode
+
+        # Würfe dauerhaft in SQLite: Pfad, leer = sessions.db im Projektordner, "off" = aus
+        self.session_db = opts.get("session_db", "")
+        # Telemetrie der Session (Capture, Matching, Sound); optional als JSON-Zeilen in metrics_file
+        self.metrics = Metrics(jsonl_path=opts.get("metrics_file") or None)
         
         # Ensure cast_button is in opts for saving
         if "cast_button" not in opts:
@@ -112,78 +158,132 @@ class MainAgent:
             except ValueError:
                 pass
 
-def is_wayland():
-    """Check if running on Wayland."""
-    if platform.system() != "Linux":
+    def select_area(self, area_id):
+        """Übernimmt Muster, Suchregion und Schwellen eines Gebiets aus areas.json."""
+        area = AREAS[area_id]
+        self.selected_area_id = area_id
+        self.selected_area_pattern = area["pattern"]
+        self.selected_area_name = area["name"]
+        self.selected_area_region = area.get("search_region")
+        self.selected_area_min_confidence = area.get("min_confidence")
+        self.selected_area_accept_confidence = area.get("accept_confidence")
+
+    @property
+    def running(self):
+        return not self.stop_event.is_set()
+
+    @running.setter
+    def running(self, value):
+        if value:
+            self.stop_event.clear()
+            return
+        self.stop_event.set()
+        # Wartende sofort aufwecken: Capture-Thread und request_frame()
+        self._frame_request.set()
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+
+    def request_frame(self, timeout=FRAME_REQUEST_TIMEOUT, region=None):
+        """
+        Fordert einen frischen Screenshot an und wartet darauf. Gibt None zurück, wenn keiner kam.
+        region=(x, y, w, h): nur dieser Ausschnitt wird aufgenommen (landet in cur_patch, nicht in cur_img).
+        """
+        with self.frame_ready:
+            if region is not None:
+                self._frame_region = tuple(region)
+            seq = self._patch_seq if region is not None else self._frame_seq
+            self._frame_request.set()
+            got_frame = self.frame_ready.wait_for(
+                lambda: (self._patch_seq if region is not None else self._frame_seq) > seq or not self.running,
+                timeout)
+            if region is not None:
+                if not got_frame or self._patch_seq == seq:
+                    return None
+                return self.cur_patch
+            if not got_frame or self._frame_seq == seq:
+                return None
+            return self.cur_img
+
+    def wait_for_frame_request(self, timeout=None):
+        """Für den Capture-Thread: True, wenn jetzt ein Screenshot gemacht werden soll (False nach Stop)."""
+        if self.capture_mode == "continuous":
+            return self.running
+        if self._frame_request.wait(timeout):
+            self._frame_request.clear()
+            return self.running
         return False
-    return "WAYLAND_DISPLAY" in os.environ
 
-def capture_screen_wayland():
-    """Capture screen using spectacle on Wayland."""
-    try:
-        # Spectacle command to capture active screen to stdout
-        # -b: background (no GUI)
-        # -n: non-notifying
-        # -o: output file (/dev/stdout for pipe)
-        # Note: Spectacle might not support direct stdout piping in all versions easily,
-        # so we might need a temp file. Let's try temp file for reliability.
-        temp_file = "/tmp/fishing_bot_capture.png"
-        subprocess.run(["spectacle", "-b", "-n", "-o", temp_file], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        if os.path.exists(temp_file):
-            img = cv.imread(temp_file)
-            return img
-    except Exception as e:
-        print(f"Spectacle capture error: {e}")
-    return None
-
-def update_screen(agent):
-    use_wayland = is_wayland()
-    if use_wayland:
-        print("Starting screen capture (Spectacle/Wayland)...")
-        sct = None
-    else:
-        print("Starting screen capture (MSS)...")
-        sct = mss.mss()
-        monitor = sct.monitors[1]
+    def take_frame_region(self):
+        """Für den Capture-Thread: angeforderter Ausschnitt (x, y, w, h) oder None für den ganzen Bildschirm."""
+        with self.frame_ready:
+            region, self._frame_region = self._frame_region, None
+        return region
+
+    def publish_frame(self, img, region=None):
+        """Für den Capture-Thread: neuen Screenshot (bzw. Ausschnitt zu region) bereitstellen und Wartende wecken."""
+        if region is not None:
+            with self.frame_ready:
+                self.cur_patch = img
+                self._patch_seq += 1
+                self.frame_ready.notify_all()
+            return
+        with self.frame_ready:
+            self.cur_img = img
+            self._frame_seq += 1
+            self.frame_ready.notify_all()
+        now = time.time()
+        # Im Modus "on_demand" wäre das nur die Rate der Anforderungen (dort zählt frame_wait)
+        if self.capture_mode == "continuous" and self._last_publish is not None and now > self._last_publish:
+            self.metrics.observe("capture_fps", 1.0 / (now - self._last_publish), FPS_BUCKETS)
+        self._last_publish = now
+
+def update_screen(agent, sct=None):
+    # sct: fertiges Capture-Backend (z.B. aus dem Replay), sonst laut options.txt
+    if sct is None:
+        # cv2/numpy erst, wenn wirklich aufgenommen wird
+        from fishing.screen_capture import create_capture_backend
+        sct = create_capture_backend(load_options())
+    print(f"Starting screen capture ({sct.name})...")
 
     loop_time = time.time()
     fps_print_time = time.time()
     
-    while True:
-        if not agent.running:
-            # Wenn Bot gestoppt ist, kurz warten um CPU zu sparen
-            time.sleep(0.5)
+    while not agent.stop_event.is_set():
+        # Im Modus "on_demand" schläft der Thread, bis ein Frame angefordert wird (ein Stop weckt ihn auch)
+        if not agent.wait_for_frame_request():
             continue
 
         try:
-            img = None
-            if use_wayland:
-                img = capture_screen_wayland()
-            else:
-                # Screenshot machen (gibt raw pixels zurück)
-                sct_img = sct.grab(monitor)
-                # Konvertieren zu Numpy Array für OpenCV
-                img = np.array(sct_img)
-                # MSS gibt BGRA zurück, OpenCV mag BGR (Alpha Channel entfernen)
-                img = cv.cvtColor(img, cv.COLOR_BGRA2BGR)
+            # MSS liefert eine BGRA-Sicht auf den Screenshot-Puffer (keine Kopie),
+            # nach BGR wird erst im FishingAgent umgewandelt
+            region = agent.take_frame_region()
+            if region is not None:
+                # Nur ein kleiner Ausschnitt (Bewegung am Köder), ohne Pause direkt zur nächsten Anforderung
+                img = sct.grab_region(*region)
+                if img is not None:
+                    agent.publish_frame(img, region)
+                continue
+            img = sct.grab()
             
             if img is not None:
-                agent.cur_img = img
+                agent.publish_frame(img)
 
                 cur_time = time.time()
-                if cur_time - fps_print_time >= FPS_REPORT_DELAY:
+                if agent.capture_mode == "continuous" and cur_time - fps_print_time >= FPS_REPORT_DELAY:
                     print('FPS: {:.2f}'.format(1 / (cur_time - loop_time)))
                     fps_print_time = cur_time
                 loop_time = cur_time
             
-            # Minimale Pause für CPU-Entlastung
-            # Bei Wayland/Spectacle etwas länger warten, da Prozessaufruf teuer ist
-            time.sleep(0.1 if use_wayland else 0.01)
+            # Minimale Pause für CPU-Entlastung (Spectacle wartet länger, da Prozessaufruf teuer ist)
+            if agent.capture_mode == "continuous":
+                agent.stop_event.wait(sct.frame_interval)
             
         except Exception as e:
             print(f"Screen capture error: {e}")
-            time.sleep(1)
+            agent.stop_event.wait(1)
+
+    sct.close()
+    print("Screen capture stopped.")
 
 def print_menu(current_area_name, current_device_id):
     print('\n--- Fishing Bot Menu ---')
@@ -203,8 +303,7 @@ def select_area(main_agent):
     choice = input("Wähle eine Nummer: ").strip()
     
     if choice in AREAS:
-        main_agent.selected_area_pattern = AREAS[choice]["pattern"]
-        main_agent.selected_area_name = AREAS[choice]["name"]
+        main_agent.select_area(choice)
         print(f"Gebiet geändert auf: {main_agent.selected_area_name}")
 
         # Auswahl persistieren (bestehende Optionen laden und aktualisieren)
@@ -217,6 +316,7 @@ def select_area(main_agent):
 def select_audio_device(main_agent):
     print("\nVerfügbare Audio-Eingabegeräte:")
     try:
+        import fishing.sound_detect as sound_detect
         devices = sound_detect.get_audio_devices()
         for idx, name in devices:
             marker = " *" if main_agent.audio_device_id == idx else ""
@@ -248,16 +348,29 @@ def select_audio_device(main_agent):
     except Exception as e:
         print(f"Fehler bei der Geräteauswahl: {e}")
 
+def preload_area_templates():
+    """Startet das Dekodieren aller Gebiets-Templates im Hintergrund."""
+    patterns = [data["pattern"] for data in AREAS.values()]
+
+    def preload():
+        # cv2 wird im Hintergrund-Thread importiert, nicht beim Programmstart
+        import fishing.template_store as template_store
+        template_store.preload(patterns)
+
+    Thread(target=preload, name="template preload", daemon=True).start()
+
 def run():
     main_agent = MainAgent()
+    preload_area_templates()
     
-    screen_capture_started = False
+    update_screen_thread = None
+    agent = None
     while True:
         print_menu(main_agent.selected_area_name, main_agent.audio_device_id)
         user_input = input().lower().strip()
 
         if user_input == 's':
-            if not screen_capture_started:
+            if update_screen_thread is None or not update_screen_thread.is_alive():
                 # Flag setzen, damit update_screen läuft
                 main_agent.running = True 
                 
@@ -267,18 +380,29 @@ def run():
                     name="update screen thread",
                     daemon=True)
                 update_screen_thread.start()
-                screen_capture_started = True
                 
                 print("Waiting for screen capture...")
-                while main_agent.cur_img is None:
-                    time.sleep(0.1)
+                while main_agent.request_frame() is None:
+                    print("Noch kein Screenshot, versuche erneut...")
 
             # Hier übergeben wir das ausgewählte Pattern und Audio Device an den FishingAgent
+            import fishing.fishing_agent as fishing_agent
             agent = fishing_agent.FishingAgent(
                 main_agent, 
                 target_pattern=main_agent.selected_area_pattern,
                 audio_device_id=main_agent.audio_device_id,
-                cast_button=main_agent.cast_button
+                cast_button=main_agent.cast_button,
+                search_region=main_agent.selected_area_region,
+                min_confidence=main_agent.selected_area_min_confidence,
+                accept_confidence=main_agent.selected_area_accept_confidence,
+                match_engine=main_agent.match_engine,
+                sound_score=main_agent.sound_score,
+                sound_engine=main_agent.sound_engine,
+                sound_templates=main_agent.sound_templates,
+                bite_signal=main_agent.bite_signal,
+                match_scales=main_agent.match_scales,
+                match_features=main_agent.match_features,
+                session_db=main_agent.session_db
             )
             agent.run()
 
@@ -290,6 +414,8 @@ def run():
 
         elif user_input == 'q':
             print("Shutting down.")
+            if agent is not None:
+                agent.stop()
             break
     print("Done.")
     
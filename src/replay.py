@@ -0,0 +1,314 @@
+"""
+Offline-Replay: lässt den FishingAgent gegen aufgezeichnete Frames und Audio laufen.
+
+    python src/replay.py --frames aufnahme/frames --fps 10 --audio aufnahme/audio.wav --bites 12.5,41.0
+    python src/replay.py --frames aufnahme.mp4 --fps 30 --audio aufnahme.wav --bites 12.5 --area "Meine Zone" --speed 2
+
+Frames (Ordner oder Video) und Audio (WAV) laufen auf derselben Replay-Uhr. Maus und Tastatur gehen an
+einen aufzeichnenden Ersatz statt an pyautogui. --bites sind die Startzeiten der Biss-Geräusche in
+Sekunden ab Beginn der Aufnahme; daraus werden Treffer, Verfehlte und Latenz pro Wurf berechnet.
+Latenzen sind Replay-Zeit: für verlässliche Werte mit --speed 1 laufen lassen.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from main import AREAS, MainAgent, update_screen
+from fishing.fishing_agent import FishingAgent
+from fishing.screen_capture import FileReplayCapture
+from fishing.timings import AdaptiveTimings
+
+# Ein Biss zählt noch zum Wurf, wenn sein Geräusch so kurz nach dem Ende der Wartephase endet
+BITE_GRACE = 0.5
+
+
+class ReplayClock:
+    """Gemeinsame Zeitbasis für Frames, Audio und Eingaben (Sekunden seit Start, mal speed)."""
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.monotonic()
+
+    def __call__(self):
+        if self._t0 is None:
+            return 0.0
+        return (time.monotonic() - self._t0) * self.speed
+
+
+class RecordingInput:
+    """Ersatz für pyautogui: führt nichts aus, merkt sich jede Aktion mit Replay-Zeit."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.events = []
+
+    @staticmethod
+    def easeOutQuad(n):
+        return -n * (n - 2)
+
+    def _record(self, action, *args):
+        self.events.append((self.clock(), action, args))
+
+    def rightClick(self):
+        self._record("rightClick")
+
+    def leftClick(self):
+        self._record("leftClick")
+
+    def middleClick(self):
+        self._record("middleClick")
+
+    def press(self, key):
+        self._record("press", key)
+
+    def moveTo(self, x, y, duration=0.0, tween=None):
+        self._record("moveTo", x, y)
+
+
+class WavStream:
+    """
+    Audioquelle mit der Schnittstelle von sounddevice.InputStream: ruft den Callback in Blöcken
+    mit den Samples auf, die zur aktuellen Replay-Zeit gehören. Wie ein echtes Gerät beginnt sie
+    beim Öffnen mit dem aktuellen Zeitpunkt der Aufnahme.
+    """
+
+    def __init__(self, samples, sample_rate, blocksize, callback, clock):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="wav replay", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        block = self.blocksize
+        pos = int(self.clock() * self.sample_rate)
+        interval = block / (self.sample_rate * self.clock.speed)
+        while not self._stop.is_set():
+            target = min(int(self.clock() * self.sample_rate), len(self.samples))
+            while pos + block <= target:
+                self.callback(self.samples[pos:pos + block].reshape(-1, 1), block, None, None)
+                pos += block
+            if pos + block > len(self.samples):
+                return
+            self._stop.wait(interval)
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+
+def load_wav(path, sample_rate):
+    import librosa
+    samples, _ = librosa.load(path, sr=sample_rate, mono=True)
+    return samples.astype(np.float32)
+
+
+def instrument(agent, clock):
+    """Hängt sich an Wurf, Matching und Sound-Erkennung des Agenten und sammelt pro Wurf die Ergebnisse."""
+    casts = []
+    cast_lure = agent.cast_lure
+    match_templates = agent.match_templates
+    watch_lure = agent.watch_lure
+
+    def recorded_cast():
+        casts.append({"cast": clock(), "confidence": None, "lure": None, "watch": None, "source": None})
+        return cast_lure()
+
+    def recorded_match(*args, **kwargs):
+        value, loc = match_templates(*args, **kwargs)
+        if casts:
+            casts[-1]["confidence"] = value
+            casts[-1]["lure"] = loc
+        return value, loc
+
+    def recorded_watch():
+        start = clock()
+        next_state = watch_lure()
+        if casts:
+            # Quelle des Bisses: bei Bewegung zählt die Latenz ab Beginn des Bisses, nicht ab Ende des Geräuschs
+            casts[-1]["watch"] = (start, clock(), agent.current_cast.get("detected", False))
+            casts[-1]["source"] = agent.current_cast.get("bite_source")
+        return next_state
+
+    agent.cast_lure = recorded_cast
+    agent.match_templates = recorded_match
+    agent.watch_lure = recorded_watch
+    return casts
+
+
+def scale_timings(agent, speed):
+    agent.cast_delay = tuple(t / speed for t in agent.cast_delay)
+    agent.recast_delay = tuple(t / speed for t in agent.recast_delay)
+    agent.cast_settle_time /= speed
+    agent.reel_delay /= speed
+    agent.state_timeouts = {state: t / speed for state, t in agent.state_timeouts.items()}
+    agent.motion_confirm_window /= speed
+    agent.sound_duration /= speed
+    agent.locate_poll_interval /= speed
+    agent.motion_grab_timeout /= speed
+    agent.motion_warmup /= speed
+
+
+def evaluate(casts, bites, sound_length):
+    """Ordnet die Bisse den Wartephasen zu. Gibt (Zeilen, Zusammenfassung) zurück."""
+    rows = []
+    used = set()
+    hits = misses = false_alarms = 0
+    latencies = []
+    for i, cast in enumerate(casts, 1):
+        row = {"cast": i, "confidence": cast["confidence"], "lure": cast["lure"],
+               "result": "kein Köder", "latency": None}
+        if cast["watch"] is not None:
+            start, end, detected = cast["watch"]
+            bite = next((b for b in bites if b not in used and start <= b + sound_length and b <= end + BITE_GRACE),
+                        None)
+            if bite is not None:
+                used.add(bite)
+            if detected and bite is not None:
+                hits += 1
+                row["result"] = "Treffer"
+                # Die Bewegung beginnt mit dem Biss, das Geräusch ist erst nach sound_length erkennbar
+                row["latency"] = end - (bite if cast["source"] == "motion" else bite + sound_length)
+                latencies.append(row["latency"])
+            elif detected:
+                false_alarms += 1
+                row["result"] = "Fehlalarm"
+            elif bite is not None:
+                misses += 1
+                row["result"] = "verfehlt"
+            else:
+                row["result"] = "kein Biss"
+        rows.append(row)
+
+    summary = {
+        "casts": len(casts),
+        "hits": hits,
+        "misses": misses,
+        "false_alarms": false_alarms,
+        # Bisse, die in keine Wartephase fielen (z.B. während des Auswerfens)
+        "unobserved": len(bites) - len(used),
+        "mean_latency": float(np.mean(latencies)) if latencies else None,
+        "max_latency": float(np.max(latencies)) if latencies else None,
+    }
+    return rows, summary
+
+
+def print_report(rows, summary):
+    print(f"\n{'Wurf':>4} {'Konfidenz':>9} {'Köder':>12} {'Ergebnis':>11} {'Latenz ms':>10}")
+    for row in rows:
+        conf = f"{row['confidence']:.2f}" if row["confidence"] is not None else "-"
+        lure = f"{row['lure'][0]},{row['lure'][1]}" if row["lure"] else "-"
+        latency = f"{row['latency'] * 1000:.0f}" if row["latency"] is not None else "-"
+        print(f"{row['cast']:4d} {conf:>9} {lure:>12} {row['result']:>11} {latency:>10}")
+
+    mean = f"{summary['mean_latency'] * 1000:.0f} ms" if summary["mean_latency"] is not None else "-"
+    worst = f"{summary['max_latency'] * 1000:.0f} ms" if summary["max_latency"] is not None else "-"
+    print(f"\nWürfe: {summary['casts']} | Treffer: {summary['hits']} | Verfehlt: {summary['misses']} | "
+          f"Fehlalarme: {summary['false_alarms']} | Nicht beobachtet: {summary['unobserved']} | "
+          f"Latenz Ø {mean}, max {worst}")
+
+
+def run_replay(args):
+    clock = ReplayClock(args.speed)
+    main_agent = MainAgent()
+    if args.area:
+        if args.area not in AREAS:
+            sys.exit(f"Unbekanntes Gebiet '{args.area}'. Vorhanden: {', '.join(AREAS) or '-'}")
+        main_agent.select_area(args.area)
+
+    audio = {}
+
+    def open_wav_stream(device, sample_rate, blocksize, callback):
+        return WavStream(audio["samples"], sample_rate, blocksize, callback, clock)
+
+    recorder = RecordingInput(clock)
+    agent = FishingAgent(
+        main_agent,
+        target_pattern=main_agent.selected_area_pattern,
+        cast_button=main_agent.cast_button,
+        search_region=main_agent.selected_area_region,
+        min_confidence=main_agent.selected_area_min_confidence,
+        accept_confidence=main_agent.selected_area_accept_confidence,
+        match_engine=main_agent.match_engine,
+        sound_score=main_agent.sound_score,
+        sound_engine=main_agent.sound_engine,
+        sound_templates=main_agent.sound_templates,
+        bite_signal=args.bite_signal or main_agent.bite_signal,
+        match_scales=main_agent.match_scales,
+        match_features=main_agent.match_features,
+        session_db=args.session_db or None,
+        input_device=recorder,
+        audio_stream_factory=open_wav_stream,
+    )
+    # Gelernte Zeiten nur für diesen Lauf: Replay-Zeit ist skaliert und soll timings.json nicht verfälschen
+    agent.timings = AdaptiveTimings(agent.timings.key, path=None)
+    detector = agent.sound_detector
+    audio["samples"] = load_wav(args.audio, detector.SAMPLE_RATE)
+    duration = len(audio["samples"]) / detector.SAMPLE_RATE
+    if args.duration:
+        duration = min(duration, args.duration)
+    scale_timings(agent, args.speed)
+    casts = instrument(agent, clock)
+
+    capture = FileReplayCapture(args.frames, loop=args.loop, clock=clock, fps=args.fps)
+    print(f"Replay: {capture.frame_count} Frames @ {args.fps} fps, {duration:.1f}s Audio, Tempo x{args.speed}")
+
+    main_agent.running = True
+    capture_thread = threading.Thread(target=update_screen, args=(main_agent, capture),
+                                      name="replay capture", daemon=True)
+    capture_thread.start()
+    clock.start()
+    if main_agent.request_frame() is None:
+        main_agent.running = False
+        sys.exit("Kein Frame aus der Aufnahme erhalten.")
+
+    agent.run()
+    main_agent.stop_event.wait(max(0.0, (duration - clock()) / args.speed))
+    agent.stop(timeout=5.0)
+    capture_thread.join(timeout=5.0)
+
+    bites = [float(b) for b in args.bites.split(",")] if args.bites else []
+    sound_length = detector.template_len / detector.SAMPLE_RATE
+    rows, summary = evaluate(casts, [b for b in bites if b < duration], sound_length)
+    print_report(rows, summary)
+    print(f"Aufgezeichnete Eingaben: {len(recorder.events)}")
+    print(agent.metrics.format_status())
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FishingAgent gegen aufgezeichnete Frames und Audio laufen lassen")
+    parser.add_argument("--frames", required=True, help="Ordner mit Bildern oder Videodatei")
+    parser.add_argument("--fps", type=float, default=10.0, help="Bildrate der Aufnahme")
+    parser.add_argument("--audio", required=True, help="WAV-Datei, zeitgleich zu den Frames aufgenommen")
+    parser.add_argument("--bites", default="", help="Startzeiten der Biss-Geräusche in Sekunden, kommagetrennt")
+    parser.add_argument("--area", default="", help="Gebiet aus areas.json (Standard: zuletzt gewähltes)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay-Tempo (Wartezeiten werden mitskaliert)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Nur die ersten N Sekunden abspielen")
+    parser.add_argument("--bite-signal", default="", help="audio, motion, either oder confirm (Standard: options.txt)")
+    parser.add_argument("--session-db", default="", help="Würfe zusätzlich in diese SQLite-Datei schreiben")
+    parser.add_argument("--loop", action="store_true", help="Frames wiederholen, wenn das Audio länger ist")
+    run_replay(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
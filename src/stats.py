@@ -0,0 +1,146 @@
+"""
+Auswertung der gespeicherten Sessions (sessions.db, geschrieben vom FishingAgent).
+
+    python src/stats.py areas                 Durchsatz pro Gebiet über alle Sessions
+    python src/stats.py sessions [--limit 20] Die letzten Sessions
+    python src/stats.py quality [--area Tanaris] Erkennungsqualität: Konfidenz, Sound-Score, Ergebnisse
+
+Bei jedem Befehl wählt --db PATH eine andere Datenbank, --days N beschränkt auf die letzten N Tage.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from fishing.session_store import DB_PATH, connect
+
+OUTCOMES = ("bite", "timeout", "rejected", "no_lure")
+# Grenzen für die Verteilung der Match-Konfidenz
+CONFIDENCE_BINS = (0.5, 0.6, 0.7, 0.8, 0.9, 1.01)
+
+
+def fmt(value, spec, unit=""):
+    return "-" if value is None else format(value, spec) + unit
+
+
+def since_clause(args, column="time"):
+    if not args.days:
+        return "", ()
+    return f" AND {column} >= ?", (time.time() - args.days * 86400,)
+
+
+def report_areas(conn, args):
+    where, params = since_clause(args)
+    session_where, session_params = since_clause(args, "s.started")
+    # Dauer einer abgebrochenen Session (ohne ended): bis zum letzten Wurf
+    durations = dict(conn.execute(
+        "SELECT s.area, SUM(COALESCE(s.ended, (SELECT MAX(time) FROM casts WHERE session_id = s.id), s.started)"
+        " - s.started) FROM sessions s WHERE 1=1" + session_where + " GROUP BY s.area", session_params).fetchall())
+    rows = conn.execute(
+        "SELECT area, COUNT(DISTINCT session_id), COUNT(*), SUM(outcome = 'bite'), SUM(outcome = 'timeout'),"
+        " SUM(outcome IN ('rejected', 'no_lure')), AVG(confidence), AVG(cast_to_locate), AVG(locate_to_bite)"
+        " FROM casts WHERE 1=1" + where + " GROUP BY area ORDER BY COUNT(*) DESC", params).fetchall()
+    if not rows:
+        print("Keine Würfe gespeichert.")
+        return
+    print(f"{'Gebiet':<20} {'Sess.':>5} {'Würfe':>6} {'Bisse':>6} {'Quote':>6} {'Würfe/h':>8} {'Bisse/h':>8} "
+          f"{'Timeouts':>8} {'ohne Köder':>10} {'Ø Konf.':>7} {'Ø Köder':>7} {'Ø Biss':>7}")
+    for area, sessions, casts, bites, timeouts, missing, conf, locate, bite_wait in rows:
+        hours = (durations.get(area) or 0.0) / 3600
+        print(f"{(area or '-')[:20]:<20} {sessions:5d} {casts:6d} {bites:6d} {bites / casts:6.0%} "
+              f"{fmt(casts / hours if hours else None, '8.0f'):>8} {fmt(bites / hours if hours else None, '8.0f'):>8} "
+              f"{timeouts:8d} {missing:10d} {fmt(conf, '7.2f'):>7} {fmt(locate, '6.1f', 's'):>7} "
+              f"{fmt(bite_wait, '6.1f', 's'):>7}")
+
+
+def report_sessions(conn, args):
+    where, params = since_clause(args, "s.started")
+    rows = conn.execute(
+        "SELECT s.id, s.started, s.ended, s.area, COUNT(c.id), SUM(c.outcome = 'bite'), MAX(c.time)"
+        " FROM sessions s LEFT JOIN casts c ON c.session_id = s.id WHERE 1=1" + where +
+        " GROUP BY s.id ORDER BY s.started DESC LIMIT ?", params + (args.limit,)).fetchall()
+    if not rows:
+        print("Keine Sessions gespeichert.")
+        return
+    print(f"{'ID':>5} {'Start':<16} {'Dauer':>8} {'Gebiet':<20} {'Würfe':>6} {'Bisse':>6} {'Würfe/h':>8}")
+    for sid, started, ended, area, casts, bites, last in rows:
+        duration = (ended or last or started) - started
+        per_hour = casts / duration * 3600 if duration > 0 else None
+        print(f"{sid:5d} {time.strftime('%Y-%m-%d %H:%M', time.localtime(started)):<16} "
+              f"{duration / 60:7.1f}m {(area or '-')[:20]:<20} {casts:6d} {bites or 0:6d} {fmt(per_hour, '8.0f'):>8}"
+              f"{'' if ended else '  (abgebrochen)'}")
+
+
+def report_quality(conn, args):
+    where, params = since_clause(args)
+    if args.area:
+        where += " AND area = ?"
+        params += (args.area,)
+    total = conn.execute("SELECT COUNT(*) FROM casts WHERE 1=1" + where, params).fetchone()[0]
+    if not total:
+        print("Keine Würfe gespeichert.")
+        return
+
+    print(f"Würfe: {total}" + (f" in {args.area}" if args.area else ""))
+    print("\nErgebnis:")
+    counts = dict(conn.execute("SELECT outcome, COUNT(*) FROM casts WHERE 1=1" + where + " GROUP BY outcome",
+                               params).fetchall())
+    for outcome in OUTCOMES:
+        n = counts.get(outcome, 0)
+        print(f"  {outcome:<10} {n:6d} {n / total:6.1%}")
+
+    print("\nMatch-Konfidenz:")
+    lower = 0.0
+    for upper in CONFIDENCE_BINS:
+        n = conn.execute("SELECT COUNT(*) FROM casts WHERE confidence >= ? AND confidence < ?" + where,
+                         (lower, upper) + params).fetchone()[0]
+        label = f"{lower:.1f}-{min(upper, 1.0):.1f}"
+        print(f"  {label:<10} {n:6d} {'#' * round(40 * n / total)}")
+        lower = upper
+
+    # Sound-Score getrennt nach Ergebnis: liegen Bisse und Timeouts weit genug auseinander?
+    print("\nSound-Score (Spitze der Wartephase):")
+    print(f"  {'Ergebnis':<10} {'Anzahl':>6} {'Ø':>6} {'min':>6} {'max':>6}")
+    for outcome, n, avg, low, high in conn.execute(
+            "SELECT outcome, COUNT(sound_score), AVG(sound_score), MIN(sound_score), MAX(sound_score)"
+            " FROM casts WHERE sound_score IS NOT NULL" + where + " GROUP BY outcome", params):
+        print(f"  {outcome:<10} {n:6d} {fmt(avg, '6.2f')} {fmt(low, '6.2f')} {fmt(high, '6.2f')}")
+
+    sources = conn.execute("SELECT bite_source, COUNT(*) FROM casts WHERE outcome = 'bite'" + where +
+                           " GROUP BY bite_source", params).fetchall()
+    if sources:
+        print("\nBiss erkannt durch: " + ", ".join(f"{source or 'audio'} {n}" for source, n in sources))
+    reel = conn.execute("SELECT AVG(bite_to_reel) FROM casts WHERE bite_to_reel IS NOT NULL" + where,
+                        params).fetchone()[0]
+    print(f"Ø Biss -> Einholen: {fmt(reel, '.2f', 's')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auswertung der gespeicherten Angel-Sessions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=DB_PATH, help="SQLite-Datei (Standard: sessions.db im Projektordner)")
+    common.add_argument("--days", type=float, default=0.0, help="Nur die letzten N Tage")
+
+    sub.add_parser("areas", parents=[common], help="Durchsatz und Bissquote pro Gebiet").set_defaults(func=report_areas)
+    p_sessions = sub.add_parser("sessions", parents=[common], help="Die letzten Sessions")
+    p_sessions.add_argument("--limit", type=int, default=20)
+    p_sessions.set_defaults(func=report_sessions)
+    p_quality = sub.add_parser("quality", parents=[common], help="Verteilung von Konfidenz, Sound-Score und Ergebnissen")
+    p_quality.add_argument("--area", default="", help="Nur dieses Gebiet (Name wie in areas.json)")
+    p_quality.set_defaults(func=report_quality)
+
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"Keine Datenbank unter {args.db}")
+    conn = connect(args.db)
+    try:
+        args.func(conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
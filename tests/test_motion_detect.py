@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "src"))
+
+from fishing.motion_detect import MotionDetector
+
+
+def make_patch(seed, shift=0):
+    """Kontrastreicher Ausschnitt mit leichtem Rauschen; shift verschiebt ihn (Köder taucht weg)."""
+    base = np.random.default_rng(0).integers(0, 256, (40, 40, 3), dtype=np.uint8)
+    noise = np.random.default_rng(seed).integers(-2, 3, base.shape)
+    patch = np.clip(base.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    return np.roll(patch, shift, axis=0)
+
+
+def feed(detector, source_fps, poll_fps=60, duration=3.0, bite=2.0):
+    """Fragt wie watch() mit poll_fps ab; die Quelle liefert nur source_fps neue Bilder, dazwischen Duplikate."""
+    for i in range(int(duration * poll_fps)):
+        now = i / poll_fps
+        frame = int(now * source_fps)
+        shift = 6 + 3 * (frame % 2) if bite <= frame / source_fps < bite + 0.3 else 0
+        detector.update(make_patch(frame, shift), now)
+
+
+def test_duplicate_frames_do_not_reset_confirmation():
+    detector = MotionDetector(confirm_frames=2)
+    for i in range(40):
+        detector.update(make_patch(i), i / 60)
+    assert not detector.detections
+
+    # Über der Schwelle, derselbe Ausschnitt noch einmal, dann wieder über der Schwelle
+    moved = make_patch(100, shift=6)
+    assert not detector.update(moved, 0.70)
+    assert not detector.update(moved, 0.72)
+    assert detector.update(make_patch(101, shift=9), 0.74)
+    assert detector.detections == [0.74]
+
+
+def test_duplicate_frames_do_not_lower_baseline():
+    detector = MotionDetector()
+    patch = make_patch(60)
+    for i in range(60):
+        detector.update(make_patch(i), i / 60)
+    detector.update(patch, 1.0)
+    baseline, frames = detector.baseline, detector.frames
+    for i in range(1, 60):
+        detector.update(patch, 1.0 + i / 60)
+    assert detector.baseline == baseline
+    assert detector.frames == frames
+
+
+def test_bite_detected_with_slow_sources():
+    for source_fps in (15, 20, 30, 60):
+        detector = MotionDetector()
+        feed(detector, source_fps)
+        assert detector.detections, f"kein Biss bei {source_fps} FPS"
+        assert 2.0 <= detector.detections[0] < 2.3